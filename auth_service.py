@@ -1,40 +1,56 @@
 # auth_service.py
 
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 import hashlib
 import jwt
 import datetime
 import requests
 
+from database import ConnectionPool, connect
+
 SECRET_KEY = "your_secret_key"  # Replace with a secure secret key in production
-QUEST_PROCESSING_SERVICE_URL = "http://localhost:8003/track-sign-in/"
+QUEST_PROCESSING_EVENTS_URL = "http://localhost:8003/events"
 
-app = FastAPI()
+# Sign-in outbox delivery to the Quest Processing Service
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_POLL_INTERVAL = 1.0  # seconds between polls when the outbox is idle
+OUTBOX_RETRY_BASE = 1.0  # first retry delay in seconds, doubled per attempt
+OUTBOX_RETRY_MAX = 300.0
+OUTBOX_REQUEST_TIMEOUT = 5.0
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Replace with specific origins in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Wallet ledger group commit
+SIGNUP_BONUS_GOLD = 20
+# Seconds the writer waits for more deltas before committing. With 0, a group
+# is whatever queued up during the previous commit; a few milliseconds pays
+# off only when each commit costs an fsync (synchronous = FULL).
+WALLET_GROUP_COMMIT_WINDOW = 0.0
+WALLET_GROUP_MAX_ENTRIES = 1000
+WALLET_APPLY_TIMEOUT = 10.0  # seconds a request waits for its group to commit
+SQL_IN_CHUNK_SIZE = 500  # maximum ids bound into a single "IN (...)" clause
 
+USER_STATUSES = {0: "new", 1: "not_new", 2: "banned"}
+USER_IDS_PAGE_MAX = 10000  # largest page GET /user-ids/ returns
 
-def get_db():
-    conn = sqlite3.connect("auth.db", check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    try:
+
+db_pool = ConnectionPool("auth.db")
+
+
+async def get_db():
+    async for conn in db_pool.get_db():
         yield conn
-    finally:
-        conn.close()
 
 
 def init_db():
-    conn = sqlite3.connect("auth.db")
+    conn = connect("auth.db")
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -48,13 +64,371 @@ def init_db():
         );
         """
     )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Sign_In_Outbox (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0 -- unix time
+        );
+        """
+    )
+    ledger_existed = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Wallet_Ledger'"
+    ).fetchone()
+    # Every gold/diamond change, append-only. Users.gold and Users.diamond are
+    # the per-user sums, kept in step in the same transaction.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Wallet_Ledger (
+            entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            gold INTEGER NOT NULL DEFAULT 0,
+            diamond INTEGER NOT NULL DEFAULT 0,
+            reason TEXT NOT NULL,
+            idempotency_key TEXT UNIQUE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_wallet_ledger_user ON Wallet_Ledger (user_id)"
+    )
+    # Serves status-filtered id pages for cohort jobs
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_status ON Users (status, user_id)"
+    )
+    if not ledger_existed:
+        # One-time migration: balances from before the ledger existed become
+        # opening entries. Later drift is left for /wallet/reconcile to report.
+        cursor.executemany(
+            """
+            INSERT INTO Wallet_Ledger (user_id, gold, diamond, reason)
+            VALUES (?, ?, ?, 'opening_balance')
+            """,
+            [
+                (
+                    row["user_id"],
+                    row["gold"] - row["ledger_gold"],
+                    row["diamond"] - row["ledger_diamond"],
+                )
+                for row in find_wallet_mismatches(conn)
+            ],
+        )
     conn.commit()
     conn.close()
 
 
+def find_wallet_mismatches(conn: sqlite3.Connection) -> list:
+    """Returns users whose balance columns differ from the sum of their ledger."""
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT u.user_id, u.gold, u.diamond,
+               COALESCE(l.gold, 0) AS ledger_gold,
+               COALESCE(l.diamond, 0) AS ledger_diamond
+        FROM Users u
+        LEFT JOIN (
+            SELECT user_id, SUM(gold) AS gold, SUM(diamond) AS diamond
+            FROM Wallet_Ledger GROUP BY user_id
+        ) l ON l.user_id = u.user_id
+        WHERE u.gold != COALESCE(l.gold, 0) OR u.diamond != COALESCE(l.diamond, 0)
+        """
+    )
+    return cursor.fetchall()
+
+
 init_db()
 
 
+class SignInDispatcher:
+    """Background thread that drains Sign_In_Outbox to the Quest Processing Service.
+
+    Each batch is posted as one sign_in event batch, which the processing
+    service applies in a single transaction, so it succeeds or fails whole
+    and a user's sign-ins stay in order.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.session = None
+
+    def start(self):
+        self.session = requests.Session()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.session.close()
+
+    def notify(self):
+        """Wakes the dispatcher so a new sign-in is delivered without waiting a poll."""
+        self._wake.set()
+
+    def _run(self):
+        conn = connect("auth.db")
+        try:
+            while not self._stop.is_set():
+                try:
+                    delivered = self.dispatch_batch(conn)
+                except Exception as e:
+                    print(f"Sign-in outbox dispatch failed: {e}")
+                    delivered = 0
+                if delivered < OUTBOX_BATCH_SIZE:
+                    self._wake.wait(OUTBOX_POLL_INTERVAL)
+                    self._wake.clear()
+        finally:
+            conn.close()
+
+    def dispatch_batch(self, conn: sqlite3.Connection) -> int:
+        """Delivers one batch of due events and returns how many were acknowledged."""
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            SELECT event_id, user_id, created_at, attempts, next_attempt_at
+            FROM Sign_In_Outbox
+            ORDER BY event_id
+            LIMIT ?
+            """,
+            (OUTBOX_BATCH_SIZE,),
+        )
+        events = cursor.fetchall()
+        # Newer sign-ins wait behind a failed batch rather than overtake it
+        if not events or events[0]["next_attempt_at"] > time.time():
+            return 0
+
+        try:
+            response = self.session.post(
+                QUEST_PROCESSING_EVENTS_URL,
+                json={
+                    "events": [
+                        {
+                            "user_id": event["user_id"],
+                            "type": "sign_in",
+                            # Streaks count the day of the login, not of delivery
+                            "occurred_at": event["created_at"],
+                        }
+                        for event in events
+                    ]
+                },
+                timeout=OUTBOX_REQUEST_TIMEOUT,
+            )
+            ok = response.status_code == 200
+            permanent = 400 <= response.status_code < 500
+            if permanent:
+                print(f"Dropping {len(events)} sign-ins: {response.text}")
+        except requests.exceptions.RequestException:
+            ok = permanent = False
+
+        done = []
+        retries = []
+        for event in events:
+            if ok or permanent:
+                done.append((event["event_id"],))
+            else:
+                delay = min(OUTBOX_RETRY_BASE * 2 ** event["attempts"], OUTBOX_RETRY_MAX)
+                retries.append((time.time() + delay, event["event_id"]))
+
+        cursor.executemany("DELETE FROM Sign_In_Outbox WHERE event_id = ?", done)
+        cursor.executemany(
+            """
+            UPDATE Sign_In_Outbox
+            SET attempts = attempts + 1, next_attempt_at = ?
+            WHERE event_id = ?
+            """,
+            retries,
+        )
+        conn.commit()
+        return len(done)
+
+
+sign_in_dispatcher = SignInDispatcher()
+
+
+def apply_wallet_entries(conn: sqlite3.Connection, entries: list) -> list:
+    """Appends ledger entries and updates balances in one transaction.
+
+    ``entries`` are ``(user_id, gold, diamond, reason, idempotency_key)``
+    tuples. Returns one result per entry: "applied", "duplicate" when its
+    idempotency key was already used, or "unknown_user".
+    """
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    user_ids = list({entry[0] for entry in entries})
+    known_users = set()
+    for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+        chunk = user_ids[start : start + SQL_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(
+            f"SELECT user_id FROM Users WHERE user_id IN ({placeholders})", chunk
+        )
+        known_users.update(row["user_id"] for row in cursor.fetchall())
+
+    results = []
+    totals = {}
+    for user_id, gold, diamond, reason, idempotency_key in entries:
+        if user_id not in known_users:
+            results.append("unknown_user")
+            continue
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO Wallet_Ledger
+                (user_id, gold, diamond, reason, idempotency_key)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (user_id, gold, diamond, reason, idempotency_key),
+        )
+        if cursor.rowcount == 0:
+            results.append("duplicate")
+            continue
+        user_gold, user_diamond = totals.get(user_id, (0, 0))
+        totals[user_id] = (user_gold + gold, user_diamond + diamond)
+        results.append("applied")
+
+    # One balance update per user, however many deltas the group held for them
+    cursor.executemany(
+        "UPDATE Users SET gold = gold + ?, diamond = diamond + ? WHERE user_id = ?",
+        [(gold, diamond, user_id) for user_id, (gold, diamond) in totals.items()],
+    )
+    conn.commit()
+    return results
+
+
+class WalletWriter:
+    """Background thread that applies wallet deltas with group commit.
+
+    Requests hand their entries to the writer and wait. The writer commits
+    everything queued by then, plus whatever arrives within
+    WALLET_GROUP_COMMIT_WINDOW, as one transaction, so concurrent grants share
+    a write lock and a commit instead of queueing for one each.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "groups": 0,
+            "requests": 0,
+            "entries": 0,
+            "max_group_entries": 0,
+            "commit_time": 0.0,
+            "failed_groups": 0,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def apply(self, entries: list) -> list:
+        """Queues entries for the next group commit and returns their results."""
+        if self._thread is None or not self._thread.is_alive():
+            raise RuntimeError("Wallet writer is not running")
+        future = Future()
+        self._queue.put((entries, future))
+        return future.result(timeout=WALLET_APPLY_TIMEOUT)
+
+    def _run(self):
+        conn = connect("auth.db")
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                group = [item]
+                count = len(item[0])
+                deadline = time.monotonic() + WALLET_GROUP_COMMIT_WINDOW
+                while count < WALLET_GROUP_MAX_ENTRIES:
+                    try:
+                        item = self._queue.get(
+                            timeout=max(deadline - time.monotonic(), 0)
+                        )
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    group.append(item)
+                    count += len(item[0])
+                self._commit(conn, group)
+        finally:
+            conn.close()
+
+    def _commit(self, conn: sqlite3.Connection, group: list):
+        entries = [entry for request_entries, _ in group for entry in request_entries]
+        start = time.perf_counter()
+        try:
+            results = apply_wallet_entries(conn, entries)
+        except Exception as e:
+            conn.rollback()
+            with self._lock:
+                self._stats["failed_groups"] += 1
+            for _, future in group:
+                future.set_exception(e)
+            return
+        with self._lock:
+            self._stats["groups"] += 1
+            self._stats["requests"] += len(group)
+            self._stats["entries"] += len(entries)
+            self._stats["max_group_entries"] = max(
+                self._stats["max_group_entries"], len(entries)
+            )
+            self._stats["commit_time"] += time.perf_counter() - start
+        offset = 0
+        for request_entries, future in group:
+            future.set_result(results[offset : offset + len(request_entries)])
+            offset += len(request_entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        groups = stats["groups"] or 1
+        stats["avg_group_requests"] = stats["requests"] / groups
+        stats["avg_commit_time"] = stats["commit_time"] / groups
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+wallet_writer = WalletWriter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    wallet_writer.start()
+    sign_in_dispatcher.start()
+    try:
+        yield
+    finally:
+        sign_in_dispatcher.stop()
+        wallet_writer.stop()
+        db_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Replace with specific origins in production
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
 # Pydantic Models
 class UserCreate(BaseModel):
     user_name: str
@@ -83,6 +457,18 @@ class UserResponse(BaseModel):
 class AddDiamonds(BaseModel):
     diamonds: Optional[int] = None
     gold: Optional[int] = None
+    idempotency_key: Optional[str] = None
+
+
+class CreditGrant(BaseModel):
+    grant_id: str
+    user_id: int
+    gold: int = 0
+    diamond: int = 0
+
+
+class CreditBatch(BaseModel):
+    grants: List[CreditGrant]
 
 
 def hash_password(password: str) -> str:
@@ -112,15 +498,15 @@ def signup(user: UserCreate, db: sqlite3.Connection = Depends(get_db)):
     try:
         hashed_password = hash_password(user.password)
         cursor = db.cursor()
+        # The new row and its starting gold commit together
         cursor.execute(
-            "INSERT INTO Users (user_name, password, status) VALUES (?, ?, ?)",
-            (user.user_name, hashed_password, user.status),
+            "INSERT INTO Users (user_name, password, status, gold) VALUES (?, ?, ?, ?)",
+            (user.user_name, hashed_password, user.status, SIGNUP_BONUS_GOLD),
         )
-        db.commit()
         user_id = cursor.lastrowid
-
         cursor.execute(
-            "UPDATE Users SET gold = gold + 20 WHERE user_id = ?", (user_id,)
+            "INSERT INTO Wallet_Ledger (user_id, gold, reason) VALUES (?, ?, ?)",
+            (user_id, SIGNUP_BONUS_GOLD, "signup_bonus"),
         )
         db.commit()
 
@@ -146,23 +532,19 @@ def login(user: UserLogin, db: sqlite3.Connection = Depends(get_db)):
         if result:
             user_id = result["user_id"]
 
-            try:
-                response = requests.post(
-                    QUEST_PROCESSING_SERVICE_URL, json={"user_id": user_id}
-                )
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=500, detail="Failed to track quest progress"
-                    )
-            except requests.exceptions.RequestException:
-                raise HTTPException(
-                    status_code=500, detail="Quest Processing service unavailable"
-                )
+            # Quest progress is tracked asynchronously from the outbox
+            cursor.execute(
+                "INSERT INTO Sign_In_Outbox (user_id) VALUES (?)", (user_id,)
+            )
+            db.commit()
+            sign_in_dispatcher.notify()
 
             token = create_token(user_id)
             return {"access_token": token, "token_type": "bearer"}
         else:
             raise HTTPException(status_code=401, detail="Invalid credentials")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -176,38 +558,119 @@ def get_user(user_id: int, db: sqlite3.Connection = Depends(get_db)):
     )
     user = cursor.fetchone()
     if user:
-        status_map = {0: "new", 1: "not_new", 2: "banned"}
         return UserResponse(
             user_id=user["user_id"],
             user_name=user["user_name"],
             gold=user["gold"],
             diamond=user["diamond"],
-            status=status_map.get(user["status"], "unknown"),
+            status=USER_STATUSES.get(user["status"], "unknown"),
         )
     else:
         raise HTTPException(status_code=404, detail="User not found")
 
 
-@app.post("/add-diamonds/{user_id}/")
-def add_diamonds(
-    user_id: int, data: AddDiamonds, db: sqlite3.Connection = Depends(get_db)
+@app.get("/user-ids/")
+def get_user_ids(
+    status: Optional[str] = None,
+    after_id: int = 0,
+    before_id: Optional[int] = None,
+    limit: int = 1000,
+    db: sqlite3.Connection = Depends(get_db),
 ):
+    """Returns one page of user ids above ``after_id`` in id order.
+
+    ``status`` filters by status name, e.g. "new"; ``before_id`` stops the
+    ids below it. Pass the last id of a page as ``after_id`` to fetch the
+    next; an empty page means the end.
+    """
+    limit = max(1, min(limit, USER_IDS_PAGE_MAX))
+    conditions, params = ["user_id > ?"], [after_id]
+    if before_id is not None:
+        conditions.append("user_id < ?")
+        params.append(before_id)
+    if status is not None:
+        codes = [code for code, name in USER_STATUSES.items() if name == status]
+        if not codes:
+            raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+        # status first, to match idx_users_status
+        conditions.insert(0, "status = ?")
+        params.insert(0, codes[0])
     cursor = db.cursor()
-    if data.diamonds is not None:
-        cursor.execute(
-            "UPDATE Users SET diamond = diamond + ? WHERE user_id = ?",
-            (data.diamonds, user_id),
-        )
-    if data.gold is not None:
-        cursor.execute(
-            "UPDATE Users SET gold = gold + ? WHERE user_id = ?", (data.gold, user_id)
-        )
-    if cursor.rowcount == 0:
+    cursor.execute(
+        f"""
+        SELECT user_id FROM Users
+        WHERE {" AND ".join(conditions)}
+        ORDER BY user_id
+        LIMIT ?
+        """,
+        params + [limit],
+    )
+    return {"user_ids": [row["user_id"] for row in cursor.fetchall()]}
+
+
+@app.post("/add-diamonds/{user_id}/")
+def add_diamonds(user_id: int, data: AddDiamonds):
+    entry = (
+        user_id,
+        data.gold or 0,
+        data.diamonds or 0,
+        "add_diamonds",
+        data.idempotency_key,
+    )
+    try:
+        (result,) = wallet_writer.apply([entry])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result == "unknown_user":
         raise HTTPException(status_code=404, detail="User not found")
-    db.commit()
     return {"message": "Rewards added successfully"}
 
 
+@app.post("/credit-batch/")
+def credit_batch(batch: CreditBatch):
+    """Applies many reward grants with the next wallet group commit.
+
+    Each grant is applied at most once per grant_id, so a sender may safely
+    resend a batch whose response it never saw. Grants for unknown users are
+    reported, not retried.
+    """
+    entries = [
+        (grant.user_id, grant.gold, grant.diamond, "quest_reward", grant.grant_id)
+        for grant in batch.grants
+    ]
+    try:
+        results = wallet_writer.apply(entries)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "credited": results.count("applied"),
+        "duplicates": results.count("duplicate"),
+        "unknown_users": sorted(
+            {
+                grant.user_id
+                for grant, result in zip(batch.grants, results)
+                if result == "unknown_user"
+            }
+        ),
+    }
+
+
+@app.get("/wallet/reconcile")
+def reconcile_wallets(db: sqlite3.Connection = Depends(get_db)):
+    """Lists users whose balances differ from their ledger; empty when in step."""
+    return {"mismatches": [dict(row) for row in find_wallet_mismatches(db)]}
+
+
+@app.get("/metrics/wallet")
+def get_wallet_metrics():
+    return wallet_writer.stats()
+
+
+@app.get("/metrics/db")
+def get_db_metrics():
+    return db_pool.stats()
+
+
 if __name__ == "__main__":
     import uvicorn
 
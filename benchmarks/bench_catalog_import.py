@@ -0,0 +1,129 @@
+# bench_catalog_import.py
+#
+# Loads the same seasonal content twice in process over ASGI: once with one
+# POST /rewards/ or POST /quests/ per item, and once as a single NDJSON
+# POST /catalog/import. Checks both produce the same quests and rewards and
+# that the change feed holds one entry per imported row.
+#
+#   python benchmarks/bench_catalog_import.py [rewards] [quests_per_reward]
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+
+def content(season, rewards, quests_per_reward):
+    """Returns (rewards, quests) of one season; quests name their reward by ref."""
+    reward_rows = [
+        {
+            "ref": f"{season}-reward-{r}",
+            "reward_name": f"{season} Reward {r}",
+            "reward_item": "gold" if r % 2 else "diamond",
+            "reward_qty": 1 + r % 50,
+        }
+        for r in range(rewards)
+    ]
+    quest_rows = [
+        {
+            "reward_ref": f"{season}-reward-{r}",
+            "auto_claim": q % 2 == 0,
+            "streak": 1 + q % 7,
+            "duplication": 1,
+            "name": f"{season} Quest {r}-{q}",
+            "description": "Sign in on consecutive days",
+            "trigger": {"event_type": "sign_in", "predicates": {"level": {"gte": q}}},
+        }
+        for r in range(rewards)
+        for q in range(quests_per_reward)
+    ]
+    return reward_rows, quest_rows
+
+
+async def load_one_by_one(client, rewards, quests):
+    reward_ids = {}
+    for reward in rewards:
+        body = {k: v for k, v in reward.items() if k != "ref"}
+        response = await client.post("/rewards/", json=body)
+        reward_ids[reward["ref"]] = response.json()["reward_id"]
+    for quest in quests:
+        body = {k: v for k, v in quest.items() if k != "reward_ref"}
+        body["reward_id"] = reward_ids[quest["reward_ref"]]
+        response = await client.post("/quests/", json=body)
+        assert response.status_code == 200, response.text
+
+
+async def load_in_bulk(client, rewards, quests):
+    rows = [dict(reward, type="reward") for reward in rewards]
+    rows += [dict(quest, type="quest") for quest in quests]
+    body = "".join(json.dumps(row) + "\n" for row in rows)
+    response = await client.post(
+        "/catalog/import",
+        content=body,
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200, response.text
+
+
+def season_catalog(quests, rewards, season):
+    """The season's quests with their rewards, ids replaced by names."""
+    names = {reward["reward_id"]: reward["reward_name"] for reward in rewards}
+    return sorted(
+        (
+            dict(
+                {k: v for k, v in quest.items() if k not in ("quest_id", "reward_id")},
+                name=quest["name"].removeprefix(season),
+                reward=names[quest["reward_id"]].removeprefix(season),
+            )
+            for quest in quests
+            if quest["name"].startswith(season)
+        ),
+        key=lambda quest: quest["name"],
+    )
+
+
+async def main(reward_count, quests_per_reward):
+    import quest_catalog_service as service
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        timings = {}
+        for season, load in (("One", load_one_by_one), ("Bulk", load_in_bulk)):
+            rewards, quests = content(season, reward_count, quests_per_reward)
+            seq_before = service.catalog_snapshot.last_seq
+            start = time.perf_counter()
+            await load(client, rewards, quests)
+            timings[season] = time.perf_counter() - start
+            changes = service.catalog_snapshot.last_seq - seq_before
+            assert changes == len(rewards) + len(quests), changes
+
+        all_quests = (await client.get("/quests/")).json()
+        all_rewards = (await client.get("/rewards/")).json()
+    one = season_catalog(all_quests, all_rewards, "One")
+    bulk = season_catalog(all_quests, all_rewards, "Bulk")
+    assert one == bulk and len(one) == reward_count * quests_per_reward
+
+    rows = reward_count * (1 + quests_per_reward)
+    print(f"{reward_count} rewards, {reward_count * quests_per_reward} quests")
+    print(
+        f"one request per item  {timings['One']:8.2f}s  {rows / timings['One']:8.0f} rows/s"
+    )
+    print(
+        f"POST /catalog/import  {timings['Bulk']:8.2f}s  "
+        f"{rows / timings['Bulk']:8.0f} rows/s  ({timings['One'] / timings['Bulk']:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    reward_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    quests_per_reward = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        asyncio.run(main(reward_count, quests_per_reward))
@@ -0,0 +1,116 @@
+# bench_catalog_snapshot.py
+#
+# Seeds a catalog through the API and times GET /quests/ and GET
+# /quests/{id}/ in process over ASGI, for the working tree and optionally a
+# git revision to compare with, e.g. the last one that queried per request.
+# Checks both return the same JSON, and that the working tree answers
+# If-None-Match with 304.
+#
+#   python benchmarks/bench_catalog_snapshot.py [quests] [requests] [baseline_rev]
+
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SERVICE_FILES = ["quest_catalog_service.py", "database.py"]
+
+
+def checkout(rev, directory):
+    """Writes the service files at ``rev`` (None for the working tree) to ``directory``."""
+    for name in SERVICE_FILES:
+        if rev is None:
+            shutil.copy(os.path.join(ROOT, name), directory)
+            continue
+        result = subprocess.run(
+            ["git", "show", f"{rev}:{name}"], cwd=ROOT, capture_output=True, check=True
+        )
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(result.stdout)
+
+
+async def measure(quests, requests):
+    """Runs inside the checkout directory; prints one JSON line of results."""
+    import quest_catalog_service as service
+
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        reward = {"reward_name": "Gold", "reward_item": "gold", "reward_qty": 5}
+        reward_id = (await client.post("/rewards/", json=reward)).json()["reward_id"]
+        for i in range(quests):
+            quest = {
+                "reward_id": reward_id,
+                "auto_claim": i % 2 == 0,
+                "streak": 1 + i % 7,
+                "duplication": 1,
+                "name": f"Quest {i}",
+                "description": "Sign in on consecutive days " * 4,
+                "trigger": {
+                    "event_type": "sign_in",
+                    "predicates": {"level": {"gte": i}},
+                },
+            }
+            await client.post("/quests/", json=quest)
+
+        results = {}
+        for label, path in (("list", "/quests/"), ("one", f"/quests/{quests // 2}/")):
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = await client.get(path)
+            results[label] = (time.perf_counter() - start) / requests
+            results[f"{label}_body"] = response.json()
+            etag = response.headers.get("etag")
+            if etag:
+                cached = await client.get(path, headers={"If-None-Match": etag})
+                results[f"{label}_revalidated"] = cached.status_code
+    print(json.dumps(results))
+
+
+def run(rev, quests, requests):
+    with tempfile.TemporaryDirectory() as directory:
+        checkout(rev, directory)
+        output = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--measure",
+                str(quests),
+                str(requests),
+            ],
+            cwd=directory,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        sys.path.insert(0, os.getcwd())
+        asyncio.run(measure(int(sys.argv[2]), int(sys.argv[3])))
+        sys.exit()
+    quests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    baseline = sys.argv[3] if len(sys.argv) > 3 else None
+
+    after = run(None, quests, requests)
+    before = run(baseline, quests, requests) if baseline else None
+    print(f"{quests} quests, {requests} requests each")
+    for label, path in (("list", "GET /quests/"), ("one", "GET /quests/{id}/")):
+        line = f"{path:<18} working tree {after[label] * 1000:7.3f} ms"
+        if before:
+            line += (
+                f"   {baseline} {before[label] * 1000:7.3f} ms"
+                f"   ({before[label] / after[label]:.1f}x)"
+            )
+            assert before[f"{label}_body"] == after[f"{label}_body"], f"{path} differs"
+        print(line)
+        assert after[f"{label}_revalidated"] == 304, after
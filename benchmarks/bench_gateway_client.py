@@ -0,0 +1,91 @@
+# bench_gateway_client.py
+#
+# Compares gateway-style upstream calls made with a fresh httpx.AsyncClient per
+# request (the old proxy_requests behaviour) against a single pooled client.
+#
+#   python benchmarks/bench_gateway_client.py [requests] [concurrency]
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from main import create_upstream_client  # noqa: E402
+
+UPSTREAM_PORT = 8099
+UPSTREAM_URL = f"http://127.0.0.1:{UPSTREAM_PORT}"
+
+upstream = FastAPI()
+
+
+@upstream.get("/quests/")
+def quests():
+    return [{"quest_id": i, "name": f"Quest {i}"} for i in range(10)]
+
+
+def start_upstream():
+    config = uvicorn.Config(
+        upstream, host="127.0.0.1", port=UPSTREAM_PORT, log_level="error"
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(label, call, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<22} p50={percentile(latencies, 50):7.2f}ms "
+        f"p99={percentile(latencies, 99):7.2f}ms "
+        f"throughput={total / elapsed:8.1f} req/s"
+    )
+
+
+async def main(total, concurrency):
+    async def per_request_client():
+        async with httpx.AsyncClient() as client:
+            await client.get(UPSTREAM_URL + "/quests/")
+
+    pooled = create_upstream_client(UPSTREAM_URL)
+
+    async def pooled_client():
+        await pooled.get("/quests/")
+
+    await run("per-request client", per_request_client, total, concurrency)
+    await run("pooled client", pooled_client, total, concurrency)
+    await pooled.aclose()
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    server = start_upstream()
+    asyncio.run(main(total, concurrency))
+    server.should_exit = True
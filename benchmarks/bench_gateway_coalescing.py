@@ -0,0 +1,173 @@
+# bench_gateway_coalescing.py
+#
+# Fires N simultaneous identical GETs through the gateway at a slow upstream and
+# checks that request coalescing turns them into exactly one upstream hit, with
+# each waiter getting a single content-length.
+# Then checks that a leader's 304, answering its own If-None-Match, is not
+# shared with waiters that sent none, and that a per-user route only shares a
+# response between calls made with the same user's token.
+#
+#   python benchmarks/bench_gateway_coalescing.py [concurrency]
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import httpx
+import jwt
+import uvicorn
+from fastapi import FastAPI, Header, Response
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import main  # noqa: E402
+
+UPSTREAM_PORT = 8098
+UPSTREAM_DELAY = 0.2
+PROFILE_ETAG = '"profile-v1"'
+
+upstream = FastAPI()
+upstream_hits = 0
+
+
+@upstream.get("/users/{user_id}")
+async def get_user(user_id: int):
+    global upstream_hits
+    upstream_hits += 1
+    await asyncio.sleep(UPSTREAM_DELAY)
+    return {"user_id": user_id, "user_name": "player", "gold": 20, "diamond": 0}
+
+
+@upstream.get("/users/{user_id}/profile")
+async def get_profile(user_id: int, if_none_match: str = Header(None)):
+    global upstream_hits
+    upstream_hits += 1
+    await asyncio.sleep(UPSTREAM_DELAY)
+    if if_none_match == PROFILE_ETAG:
+        return Response(status_code=304, headers={"ETag": PROFILE_ETAG})
+    return Response(
+        b'{"user_id":1}', media_type="application/json", headers={"ETag": PROFILE_ETAG}
+    )
+
+
+@upstream.get("/user-quests/{user_id}/")
+async def get_user_quests(user_id: int, x_user_id: int = Header(None)):
+    await asyncio.sleep(UPSTREAM_DELAY)
+    # As the processing service does, answer only the verified user
+    if x_user_id != user_id:
+        return Response(status_code=403)
+    return {"user_id": user_id, "quests": []}
+
+
+def bearer(user_id):
+    token = jwt.encode(
+        {"user_id": user_id, "exp": time.time() + 60}, main.SECRET_KEY, "HS256"
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def start_upstream():
+    config = uvicorn.Config(
+        upstream, host="127.0.0.1", port=UPSTREAM_PORT, log_level="error"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def fire(concurrency, coalescing):
+    global upstream_hits
+    upstream_hits = 0
+    main.coalesce_matcher = main.PrefixMatcher(
+        main.COALESCE_ROUTES if coalescing else {}
+    )
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://gateway"
+        ) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.get("/users/1") for _ in range(concurrency))
+            )
+            elapsed = time.perf_counter() - start
+    bodies = {r.content for r in responses}
+    assert all(r.status_code == 200 for r in responses), "non-200 response"
+    assert len(bodies) == 1, "waiters received different bodies"
+    assert all(
+        r.headers.get_list("content-length") == [str(len(r.content))] for r in responses
+    ), "waiters received a missing or repeated content-length"
+    return upstream_hits, elapsed
+
+
+async def fire_conditional_leader(waiters):
+    """A revalidating leader, then plain GETs joining its flight."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://gateway"
+        ) as client:
+            leader = asyncio.create_task(
+                client.get("/users/1/profile", headers={"If-None-Match": PROFILE_ETAG})
+            )
+            await asyncio.sleep(UPSTREAM_DELAY / 4)
+            responses = await asyncio.gather(
+                *(client.get("/users/1/profile") for _ in range(waiters))
+            )
+            leader = await leader
+    assert leader.status_code == 304, leader.status_code
+    assert all(
+        r.status_code == 200 and r.content == b'{"user_id":1}' for r in responses
+    ), {(r.status_code, r.content) for r in responses}
+    print(f"conditional leader: 304 kept to itself, {waiters} waiters got 200")
+
+
+async def fire_other_users(waiters):
+    """User 5 leads GET /user-quests/5/; other users ask for the same path."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://gateway"
+        ) as client:
+            owner = asyncio.create_task(
+                client.get("/user-quests/5/", headers=bearer(5))
+            )
+            await asyncio.sleep(UPSTREAM_DELAY / 4)
+            others = await asyncio.gather(
+                *(
+                    client.get("/user-quests/5/", headers=bearer(100 + i))
+                    for i in range(waiters)
+                )
+            )
+            owner = await owner
+    assert owner.status_code == 200, owner.status_code
+    assert all(r.status_code == 403 for r in others), {r.status_code for r in others}
+    print(f"per-user route: {waiters} other users' tokens got 403, not user 5's body")
+
+
+async def run(concurrency):
+    hits, elapsed = await fire(concurrency, coalescing=False)
+    print(
+        f"without coalescing: {concurrency} requests -> {hits} upstream hits in {elapsed:.2f}s"
+    )
+    hits, elapsed = await fire(concurrency, coalescing=True)
+    print(
+        f"with coalescing:    {concurrency} requests -> {hits} upstream hits in {elapsed:.2f}s"
+    )
+    assert hits == 1, f"expected exactly one upstream hit, got {hits}"
+    await fire_conditional_leader(10)
+    await fire_other_users(10)
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    main.SERVICES = {
+        name: [f"http://127.0.0.1:{UPSTREAM_PORT}"] for name in main.SERVICES
+    }
+    server = start_upstream()
+    asyncio.run(run(concurrency))
+    server.should_exit = True
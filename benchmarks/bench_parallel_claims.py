@@ -0,0 +1,113 @@
+# bench_parallel_claims.py
+#
+# Fires 100 simultaneous POST /claim-quest/ calls at one completed quest,
+# first without idempotency keys and then all sharing one key, and checks
+# that exactly one reward grant is queued each time. Keyed retries must all
+# get the first call's response. Does the same for POST /complete-quest/ on
+# an auto-claimed quest.
+#
+#   python benchmarks/bench_parallel_claims.py [claims]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+MANUAL_QUEST = {
+    "quest_id": 1,
+    "reward_id": 1,
+    "auto_claim": False,
+    "streak": 1,
+    "duplication": 1,
+    "name": "Manual",
+    "description": "",
+}
+AUTO_QUEST = dict(MANUAL_QUEST, quest_id=2, auto_claim=True, name="Auto")
+REWARD = {"reward_id": 1, "reward_name": "Gold", "reward_item": "gold", "reward_qty": 5}
+
+# label, endpoint, quest, starting status, whether every call shares one key
+CASES = [
+    ("claim, no key", "/claim-quest/", MANUAL_QUEST, "completed", False),
+    ("claim, shared key", "/claim-quest/", MANUAL_QUEST, "completed", True),
+    ("complete, no key", "/complete-quest/", AUTO_QUEST, "in_progress", False),
+    ("complete, shared key", "/complete-quest/", AUTO_QUEST, "in_progress", True),
+]
+
+
+def set_up_quest(user_id, quest_id, status):
+    with service.shards.pool_for(user_id).connection() as db:
+        db.execute(
+            "INSERT INTO User_Quest_Rewards (user_id, quest_id, status) VALUES (?, ?, ?)",
+            (user_id, quest_id, status),
+        )
+        db.execute(
+            """
+            INSERT INTO Quest_Progress (user_id, quest_id, progress, current_streak)
+            VALUES (?, ?, 1, 1)
+            """,
+            (user_id, quest_id),
+        )
+        db.commit()
+
+
+def queued_grants(user_id, quest_id):
+    with service.shards.pool_for(user_id).connection() as db:
+        return db.execute(
+            "SELECT COUNT(*) FROM Reward_Grant_Outbox WHERE user_id = ? AND quest_id = ?",
+            (user_id, quest_id),
+        ).fetchone()[0]
+
+
+async def fire(path, bodies):
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.post(path, json=b) for b in bodies))
+        elapsed = time.perf_counter() - start
+    return responses, elapsed
+
+
+def run(label, path, user_id, quest, status, claims, keyed):
+    set_up_quest(user_id, quest["quest_id"], status)
+    bodies = [
+        {
+            "user_id": user_id,
+            "quest_id": quest["quest_id"],
+            "idempotency_key": "retry-1" if keyed else None,
+        }
+        for _ in range(claims)
+    ]
+    responses, elapsed = asyncio.run(fire(path, bodies))
+    outcomes = Counter((response.status_code, response.text) for response in responses)
+    grants = queued_grants(user_id, quest["quest_id"])
+    print(f"{label:<22} {elapsed * 1000:7.1f}ms  grants={grants}")
+    for (status_code, text), count in outcomes.most_common():
+        print(f"    {count:>4} x {status_code} {text}")
+
+    assert grants == 1, f"{grants} grants queued"
+    successes = sum(count for (code, _), count in outcomes.items() if code == 200)
+    if keyed:
+        assert len(outcomes) == 1 and successes == claims, outcomes
+    else:
+        assert successes == 1, outcomes
+
+
+if __name__ == "__main__":
+    claims = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import quest_processing_service as service
+
+        service.catalog_cache.quests = {1: MANUAL_QUEST, 2: AUTO_QUEST}
+        service.catalog_cache.rewards = {1: REWARD}
+        for user_id, (label, path, quest, status, keyed) in enumerate(CASES, 1):
+            run(label, path, user_id, quest, status, claims, keyed)
+        service.shards.close()
+        service.db_pool.close()
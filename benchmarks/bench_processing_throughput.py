@@ -0,0 +1,190 @@
+# bench_processing_throughput.py
+#
+# Starts quest_processing_service in a subprocess behind stub catalog and auth
+# services (auth answers after AUTH_DELAY, like a loaded service) and fires
+# simultaneous POST /track-sign-in/ calls at it, one per user. Pass a git
+# revision to also run that revision's service, e.g. the last sync version:
+#
+#   python benchmarks/bench_processing_throughput.py [concurrency] [baseline_rev]
+
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SERVICE_FILES = ["quest_processing_service.py", "database.py", "sharding.py"]
+PROCESSING_URL = "http://127.0.0.1:8003"
+AUTH_DELAY = 0.05
+SIGN_IN_QUESTS = 5
+
+QUESTS = [
+    {
+        "quest_id": i,
+        "reward_id": i,
+        "auto_claim": True,
+        "streak": 1,
+        "duplication": 1,
+        "name": f"Daily Sign In {i}",
+        "description": "",
+        "trigger": {"event_type": "sign_in", "predicates": {}},
+    }
+    for i in range(1, SIGN_IN_QUESTS + 1)
+]
+REWARDS = [
+    {"reward_id": i, "reward_name": "Gold", "reward_item": "gold", "reward_qty": 5}
+    for i in range(1, SIGN_IN_QUESTS + 1)
+]
+
+catalog = FastAPI()
+auth = FastAPI()
+
+
+@catalog.get("/quests/")
+async def get_quests():
+    return QUESTS
+
+
+@catalog.get("/quests/{quest_id}/")
+async def get_quest(quest_id: int):
+    return QUESTS[quest_id - 1]
+
+
+@catalog.get("/rewards/")
+async def get_rewards():
+    return REWARDS
+
+
+@catalog.get("/rewards/{reward_id}/")
+async def get_reward(reward_id: int):
+    return REWARDS[reward_id - 1]
+
+
+@auth.post("/add-gold/{user_id}/")
+@auth.post("/add-diamonds/{user_id}/")
+async def add_currency(user_id: int):
+    await asyncio.sleep(AUTH_DELAY)
+    return {"message": "Rewards added successfully"}
+
+
+@auth.post("/credit-batch/")
+async def credit_batch(batch: dict):
+    await asyncio.sleep(AUTH_DELAY)
+    return {"credited": len(batch["grants"]), "duplicates": 0, "unknown_users": []}
+
+
+def serve_stubs():
+    """Runs the stub catalog and auth services until killed."""
+    for app, port in ((catalog, 8002), (auth, 8001)):
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error")
+        )
+        threading.Thread(target=server.run, daemon=True).start()
+    threading.Event().wait()
+
+
+def start_stubs():
+    # A separate process, so the stubs do not share a GIL with the load generator
+    process = subprocess.Popen([sys.executable, __file__, "--stubs"])
+    wait_until_up("http://127.0.0.1:8002/quests/", process)
+    wait_until_up("http://127.0.0.1:8001/add-gold/0/", process, method="POST")
+    return process
+
+
+def wait_until_up(url, process, method="GET"):
+    for _ in range(100):
+        try:
+            httpx.request(method, url)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{url} did not come up")
+
+
+def checkout(rev, directory):
+    """Writes the service files at ``rev`` (None for the working tree) to ``directory``."""
+    for name in SERVICE_FILES:
+        if rev is None:
+            shutil.copy(os.path.join(ROOT, name), directory)
+            continue
+        result = subprocess.run(
+            ["git", "show", f"{rev}:{name}"], cwd=ROOT, capture_output=True
+        )
+        # Older revisions predate database.py and sharding.py
+        if result.returncode == 0:
+            with open(os.path.join(directory, name), "wb") as f:
+                f.write(result.stdout)
+
+
+def start_service(directory):
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import uvicorn, quest_processing_service as s; "
+            "uvicorn.run(s.app, host='127.0.0.1', port=8003, log_level='error')",
+        ],
+        cwd=directory,
+        stderr=subprocess.DEVNULL,
+    )
+    wait_until_up(f"{PROCESSING_URL}/user-quests/0/", process)
+    return process
+
+
+async def fire(concurrency):
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+
+        async def sign_in(user_id):
+            start = time.perf_counter()
+            response = await client.post(
+                f"{PROCESSING_URL}/track-sign-in/", json={"user_id": user_id}
+            )
+            return response.status_code, time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(sign_in(u) for u in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies = sorted(latency for _, latency in results)
+    failures = sum(1 for status, _ in results if status != 200)
+    return elapsed, latencies, failures
+
+
+def run(label, rev, concurrency):
+    with tempfile.TemporaryDirectory() as directory:
+        checkout(rev, directory)
+        process = start_service(directory)
+        try:
+            elapsed, latencies, failures = asyncio.run(fire(concurrency))
+        finally:
+            process.terminate()
+            process.wait()
+    print(
+        f"{label:<28} {concurrency / elapsed:8.1f} logins/s "
+        f"p50={latencies[len(latencies) // 2] * 1000:8.1f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1000:8.1f}ms "
+        f"failures={failures}"
+    )
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--stubs"]:
+        serve_stubs()
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    baseline = sys.argv[2] if len(sys.argv) > 2 else None
+    stubs = start_stubs()
+    try:
+        if baseline:
+            run(f"baseline ({baseline})", baseline, concurrency)
+        run("working tree", None, concurrency)
+    finally:
+        stubs.terminate()
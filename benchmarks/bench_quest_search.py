@@ -0,0 +1,155 @@
+# bench_quest_search.py
+#
+# Loads a catalog of 100k quests through POST /catalog/import, then times a
+# few searches three ways: the FTS5 query behind GET /quests/search, the same
+# page and total from a LIKE scan of Quests, and GET /quests/search end to end
+# over ASGI. Checks the FTS5 matches are exactly the quests containing every
+# searched word (the last as a prefix).
+#
+#   python benchmarks/bench_quest_search.py [quests] [repeats]
+
+import asyncio
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+WORD_COUNT = 2000
+IMPORT_CHUNK = 20000
+# Words in 10% of quests, a rare word, a half-typed word, and the most
+# common word, which is in most quests
+QUERIES = ["sign", "daily sign", "{rare}", "{typing}", "{common}"]
+
+
+def vocabulary(rng):
+    words = set()
+    while len(words) < WORD_COUNT:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))))
+    # A few fixed words so the common queries always match
+    return sorted(words) + ["sign", "daily", "in", "the", "defeat"]
+
+
+def catalog(quest_count, words, rng):
+    # Zipf-like: low-ranked words are far more common than high-ranked ones
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    rows = []
+    for i in range(quest_count):
+        name = " ".join(rng.choices(words, weights, k=3)).title()
+        if i % 10 == 0:
+            name = "Daily Sign In " + name
+        rows.append(
+            {
+                "type": "quest",
+                "reward_id": 1,
+                "auto_claim": False,
+                "streak": 1 + i % 7,
+                "duplication": 1,
+                "name": name,
+                "description": " ".join(rng.choices(words, weights, k=12)),
+            }
+        )
+    return rows
+
+
+def expected_ids(rows, q):
+    """Quest ids (1-based import order) holding every word, the last as a prefix."""
+    *words, last = q.lower().split()
+    matched = set()
+    for quest_id, row in enumerate(rows, 1):
+        tokens = set(re.findall(r"\w+", f"{row['name']} {row['description']}".lower()))
+        if all(word in tokens for word in words) and any(
+            token.startswith(last) for token in tokens
+        ):
+            matched.add(quest_id)
+    return matched
+
+
+def like_search(db, q, limit):
+    words = q.split()
+    where = " AND ".join("(name LIKE ? OR description LIKE ?)" for _ in words)
+    params = [f"%{word}%" for word in words for _ in range(2)]
+    (total,) = db.execute(
+        f"SELECT COUNT(*) FROM Quests WHERE {where}", params
+    ).fetchone()
+    rows = db.execute(
+        f"SELECT quest_id FROM Quests WHERE {where} ORDER BY quest_id LIMIT ?",
+        params + [limit],
+    ).fetchall()
+    return total, [row[0] for row in rows]
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = fn()
+    return (time.perf_counter() - start) / repeats * 1000, result
+
+
+async def main(quest_count, repeats):
+    import quest_catalog_service as service
+
+    rng = random.Random(7)
+    words = vocabulary(rng)
+    rows = catalog(quest_count, words, rng)
+    transport = httpx.ASGITransport(app=service.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        reward = {"reward_name": "Gold", "reward_item": "gold", "reward_qty": 5}
+        await client.post("/rewards/", json=reward)
+        start = time.perf_counter()
+        for i in range(0, len(rows), IMPORT_CHUNK):
+            response = await client.post(
+                "/catalog/import", json=rows[i : i + IMPORT_CHUNK]
+            )
+            assert response.status_code == 200, response.text
+        print(f"imported {quest_count} quests in {time.perf_counter() - start:.1f}s")
+
+        placeholders = {
+            "rare": words[WORD_COUNT // 2],
+            "typing": words[50][:4],
+            "common": words[0],
+        }
+        print(
+            f"{'query':<14}{'matches':>8}{'FTS5':>10}{'LIKE':>10}{'LIKE hits':>10}{'endpoint':>10}"
+        )
+        for template in QUERIES:
+            q = template.format(**placeholders)
+            fts_query = service.search_query(q)
+            fts_ms, (total, page) = timed(
+                lambda: service.search_quests(fts_query, 20, 0), repeats
+            )
+            assert set(
+                service.search_quests(fts_query, quest_count, 0)[1]
+            ) == expected_ids(rows, q), q
+            with service.db_pool.connection() as db:
+                like_ms, (like_total, _) = timed(
+                    lambda: like_search(db, q, 20), repeats
+                )
+            assert like_total >= total, q  # substrings match inside other words too
+
+            start = time.perf_counter()
+            for _ in range(repeats):
+                response = await client.get("/quests/search", params={"q": q})
+            endpoint_ms = (time.perf_counter() - start) / repeats * 1000
+            body = response.json()
+            assert body["total"] == total
+            assert [quest["quest_id"] for quest in body["quests"]] == page
+            print(
+                f"{q!r:<14}{total:>8}{fts_ms:>8.2f}ms{like_ms:>8.2f}ms"
+                f"{like_total:>10}{endpoint_ms:>8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    quest_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        asyncio.run(main(quest_count, repeats))
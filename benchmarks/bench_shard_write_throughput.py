@@ -0,0 +1,106 @@
+# bench_shard_write_throughput.py
+#
+# Applies sign-in events from many threads at once, one write transaction per
+# event as track_sign_in does, with the per-user tables split across 1, 4 and
+# 16 shards. Every user signs in on two consecutive days, so the second event
+# completes their auto-claimed quests and queues reward grants. Checks that
+# every user ends up with claimed quests and one grant per quest.
+#
+# The default synchronous=NORMAL commits without an fsync, so on one core the
+# shards mostly save waiting on each other's write locks; pass FULL to also
+# see commits overlap their fsyncs:
+#
+#   python benchmarks/bench_shard_write_throughput.py [threads] [users] [NORMAL|FULL]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from database import connect  # noqa: E402
+from sharding import ShardSet  # noqa: E402
+
+SHARD_COUNTS = (1, 4, 16)
+DAYS = ("2024-01-01", "2024-01-02")
+QUESTS = [
+    {
+        "quest_id": i,
+        "reward_id": 1,
+        "auto_claim": True,
+        "streak": len(DAYS),
+        "duplication": 1,
+        "name": f"Daily Sign In {i}",
+        "description": "",
+    }
+    for i in range(1, 4)
+]
+REWARD = {"reward_id": 1, "reward_name": "Gold", "reward_item": "gold", "reward_qty": 5}
+
+
+def run(shard_count, threads, users, synchronous):
+    paths = service.shard_paths(shard_count)
+    for path in paths:
+        conn = connect(path)
+        service.init_shard_db(conn)
+        conn.close()
+    shards = ShardSet(paths)
+    latencies = []
+    lock = threading.Lock()
+
+    def sign_in(user_id, day):
+        start = time.perf_counter()
+        with shards.pool_for(user_id).connection() as db:
+            db.execute(f"PRAGMA synchronous = {synchronous}")
+            service.apply_events(db, [(user_id, QUESTS, day)])
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    def worker(index):
+        for day in DAYS:
+            for user_id in range(1 + index, users + 1, threads):
+                sign_in(user_id, day)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    claimed = grants = 0
+    for pool in shards.pools:
+        with pool.connection() as db:
+            claimed += db.execute(
+                "SELECT COUNT(*) FROM User_Quest_Rewards WHERE status = 'claimed'"
+            ).fetchone()[0]
+            grants += db.execute("SELECT COUNT(*) FROM Reward_Grant_Outbox").fetchone()[
+                0
+            ]
+    shards.close()
+    expected = users * len(QUESTS)
+    assert claimed == expected and grants == expected, (claimed, grants, expected)
+
+    latencies.sort()
+    print(
+        f"{shard_count:>3} shard(s) {len(latencies) / elapsed:8.0f} events/s "
+        f"p50={latencies[len(latencies) // 2] * 1000:7.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1000:7.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    synchronous = sys.argv[3].upper() if len(sys.argv) > 3 else "NORMAL"
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import quest_processing_service as service
+
+        service.catalog_cache.rewards = {1: REWARD}
+        print(f"{threads} threads, {users} users, synchronous={synchronous}")
+        for shard_count in SHARD_COUNTS:
+            run(shard_count, threads, users, synchronous)
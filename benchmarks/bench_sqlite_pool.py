@@ -0,0 +1,114 @@
+# bench_sqlite_pool.py
+#
+# Runs a mixed read/write workload from many threads (like Starlette's threadpool)
+# against a scratch database, first opening a fresh default connection per
+# operation as the services used to, then through database.ConnectionPool.
+#
+#   python benchmarks/bench_sqlite_pool.py [threads] [ops_per_thread]
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from database import ConnectionPool  # noqa: E402
+
+USERS = 1000
+WRITE_RATIO = 0.2
+
+
+def setup(path):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE Users (user_id INTEGER PRIMARY KEY, gold INTEGER DEFAULT 0)"
+    )
+    conn.executemany(
+        "INSERT INTO Users (user_id) VALUES (?)", [(i,) for i in range(USERS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def operation(conn):
+    user_id = random.randrange(USERS)
+    if random.random() < WRITE_RATIO:
+        conn.execute("UPDATE Users SET gold = gold + 1 WHERE user_id = ?", (user_id,))
+        conn.commit()
+    else:
+        conn.execute("SELECT * FROM Users WHERE user_id = ?", (user_id,)).fetchone()
+
+
+def run(label, checkout, threads, ops):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        local = []
+        for _ in range(ops):
+            start = time.perf_counter()
+            try:
+                with checkout() as conn:
+                    operation(conn)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors.append(str(e))
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print(
+        f"{label:<26} {len(latencies) / elapsed:9.1f} ops/s "
+        f"p50={latencies[len(latencies) // 2]:7.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99)]:8.2f}ms "
+        f"errors={len(errors)}"
+    )
+
+
+def fresh_connection(path):
+    """The old get_db: a new default connection per request."""
+
+    @contextmanager
+    def checkout():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    return checkout
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    ops = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "old.db")
+        setup(old_path)
+        run("connection per request", fresh_connection(old_path), threads, ops)
+
+        new_path = os.path.join(tmp, "pooled.db")
+        setup(new_path)
+        pool = ConnectionPool(new_path)
+        run("ConnectionPool (WAL)", pool.connection, threads, ops)
+        stats = pool.stats()
+        print(
+            f"pool: opened={stats['opened']} checkouts={stats['checkouts']} "
+            f"waits={stats['waits']} avg_wait={stats['avg_wait_time'] * 1000:.2f}ms "
+            f"avg_checkout={stats['avg_checkout_time'] * 1000:.2f}ms"
+        )
+        pool.close()
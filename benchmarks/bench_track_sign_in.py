@@ -0,0 +1,144 @@
+# bench_track_sign_in.py
+#
+# Times one sign-in against 10, 100 and 1000 sign-in quests with the original
+# per-quest loop (SELECT/COUNT/INSERT/UPDATE and a commit per write) and with
+# the set-based apply_events, and checks both track the same quests. Statuses
+# and messages differ since streaks are counted by calendar day.
+#
+#   python benchmarks/bench_track_sign_in.py [users]
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from database import connect  # noqa: E402
+
+DAY = "2024-01-01"
+
+
+def make_quests(count):
+    return [
+        {
+            "quest_id": i,
+            "reward_id": 1,
+            "auto_claim": i % 2 == 0,
+            "streak": 1 + i % 4,
+            "duplication": 1 + i % 3,
+            "name": f"Sign In {i}",
+            "description": "",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_track_sign_in(db, user_id, sign_in_quests):
+    """The loop track_sign_in used before it was made set-based."""
+    messages = []
+    cursor = db.cursor()
+    for quest in sign_in_quests:
+        quest_id = quest["quest_id"]
+        streak_required = quest["streak"]
+        auto_claim = quest["auto_claim"]
+        duplication_limit = quest.get("duplication", 1)
+        cursor.execute(
+            "SELECT status FROM User_Quest_Rewards WHERE user_id = ? AND quest_id = ?",
+            (user_id, quest_id),
+        )
+        result = cursor.fetchone()
+        current_status = result["status"] if result else None
+        if current_status == "claimed":
+            messages.append(f"Quest '{quest['name']}' already claimed.")
+            continue
+        cursor.execute(
+            "SELECT COUNT(*) as count FROM User_Quest_Rewards WHERE user_id = ? AND quest_id = ?",
+            (user_id, quest_id),
+        )
+        count_result = cursor.fetchone()
+        current_count = count_result["count"] if count_result else 0
+        if current_count >= duplication_limit:
+            messages.append(f"Quest '{quest['name']}' duplication limit reached.")
+            continue
+        if not result:
+            cursor.execute(
+                "INSERT INTO User_Quest_Rewards (user_id, quest_id, status) VALUES (?, ?, ?)",
+                (user_id, quest_id, "in_progress"),
+            )
+            db.commit()
+            current_count += 1
+        if current_count + 1 >= streak_required:
+            status = "claimed" if auto_claim else "completed"
+            cursor.execute(
+                "UPDATE User_Quest_Rewards SET status = ? WHERE user_id = ? AND quest_id = ?",
+                (status, user_id, quest_id),
+            )
+            db.commit()
+            if auto_claim:
+                messages.append(
+                    f"Quest '{quest['name']}' completed and reward granted."
+                )
+            else:
+                messages.append(
+                    f"Quest '{quest['name']}' completed. Please claim your reward."
+                )
+        else:
+            cursor.execute(
+                "UPDATE User_Quest_Rewards SET status = ? WHERE user_id = ? AND quest_id = ?",
+                ("in_progress", user_id, quest_id),
+            )
+            db.commit()
+            messages.append(
+                f"Progress for quest '{quest['name']}': {current_count + 1}/{streak_required}"
+            )
+    return messages
+
+
+def set_based_track_sign_in(db, user_id, sign_in_quests):
+    (messages,) = service.apply_events(db, [(user_id, sign_in_quests, DAY)])
+    return messages
+
+
+def rows(db):
+    return db.execute(
+        "SELECT user_id, quest_id FROM User_Quest_Rewards ORDER BY 1, 2"
+    ).fetchall()
+
+
+def run(quest_count, users):
+    quests = make_quests(quest_count)
+    results = {}
+    for label, track in (
+        ("per-quest loop", legacy_track_sign_in),
+        ("set-based", set_based_track_sign_in),
+    ):
+        db = connect("quest_processing.db")
+        db.execute("DELETE FROM User_Quest_Rewards")
+        db.execute("DELETE FROM Quest_Progress")
+        db.commit()
+        start = time.perf_counter()
+        # Two sign-ins per user: one creating rows, one advancing them
+        for _ in range(2):
+            for user_id in range(users):
+                track(db, user_id, quests)
+        elapsed = (time.perf_counter() - start) / (2 * users)
+        results[label] = [tuple(r) for r in rows(db)]
+        db.close()
+        print(f"{quest_count:5} quests  {label:<15} {elapsed * 1000:9.2f} ms/sign-in")
+    assert results["per-quest loop"] == results["set-based"], "tracked quests differ"
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import quest_processing_service as service
+
+        # apply_events queues rewards from the catalog cache
+        service.catalog_cache.rewards = {
+            1: {"reward_id": 1, "reward_item": "gold", "reward_qty": 5}
+        }
+        for quest_count in (10, 100, 1000):
+            run(quest_count, users)
@@ -0,0 +1,155 @@
+# bench_user_quests.py
+#
+# Builds a synthetic heavy player with 10k User_Quest_Rewards rows (among
+# other users' rows) and times GET /user-quests/{user_id}/ the old way (every
+# row, one Pydantic model each) against keyset pages, a status filter and a
+# field projection. Also checks the page queries use a covering index and that
+# walking every page returns each row exactly once.
+#
+#   python benchmarks/bench_user_quests.py [rows] [repeat]
+
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from database import connect  # noqa: E402
+
+HEAVY_USER = 1
+OTHER_USERS = 1000
+OTHER_ROWS_PER_USER = 20
+STATUSES = ["in_progress", "completed", "claimed"]
+
+
+class LegacyUserQuestReward(BaseModel):
+    user_id: int
+    quest_id: int
+    status: str
+    date: str
+
+
+def add_legacy_route(app):
+    """Mounts the handler GET /user-quests used before paging."""
+
+    @app.get(
+        "/legacy-user-quests/{user_id}/", response_model=List[LegacyUserQuestReward]
+    )
+    def legacy_user_quests(user_id: int):
+        db = connect("quest_processing.db")
+        rows = db.execute(
+            "SELECT quest_id, status, date FROM User_Quest_Rewards WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        db.close()
+        return [
+            LegacyUserQuestReward(
+                user_id=user_id,
+                quest_id=row["quest_id"],
+                status=row["status"],
+                date=row["date"],
+            )
+            for row in rows
+        ]
+
+
+def populate(rows):
+    db = connect("quest_processing.db")
+    # Few distinct dates, so the quest_id tie-breaker is exercised
+    db.executemany(
+        "INSERT INTO User_Quest_Rewards (user_id, quest_id, status, date) VALUES (?, ?, ?, ?)",
+        [
+            (HEAVY_USER, q, STATUSES[q % 3], f"2024-01-{1 + q % 28:02d} 00:00:00")
+            for q in range(1, rows + 1)
+        ],
+    )
+    db.executemany(
+        "INSERT INTO User_Quest_Rewards (user_id, quest_id, status) VALUES (?, ?, ?)",
+        [
+            (u, q, STATUSES[q % 3])
+            for u in range(2, OTHER_USERS + 2)
+            for q in range(OTHER_ROWS_PER_USER)
+        ],
+    )
+    db.commit()
+    db.execute("ANALYZE")
+    return db
+
+
+def check_plans(db):
+    for status in (None, "completed"):
+        columns = ["quest_id", "date", "status"]
+        conditions = "user_id = ?" + (" AND status = ?" if status else "")
+        params = [HEAVY_USER] + ([status] if status else [])
+        plan = db.execute(
+            f"""
+            EXPLAIN QUERY PLAN
+            SELECT {", ".join(columns)} FROM User_Quest_Rewards
+            WHERE {conditions} AND (date, quest_id) < (?, ?)
+            ORDER BY date DESC, quest_id DESC LIMIT 101
+            """,
+            (*params, "9999", 0),
+        ).fetchall()
+        detail = " | ".join(row["detail"] for row in plan)
+        print(f"plan (status={status}): {detail}")
+        assert "COVERING INDEX" in detail and "TEMP B-TREE" not in detail, detail
+
+
+def timed(client, url, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.get(url)
+    elapsed = (time.perf_counter() - start) / repeat
+    assert response.status_code == 200, response.text
+    return elapsed, response
+
+
+def walk_pages(client, url):
+    rows = []
+    cursor = None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        rows.extend(response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return rows
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import quest_processing_service as service
+
+        add_legacy_route(service.app)
+        db = populate(rows)
+        check_plans(db)
+        # No lifespan: these endpoints only need the database
+        client = TestClient(service.app)
+        base = f"/user-quests/{HEAVY_USER}/"
+        for label, url in (
+            ("all rows (legacy)", f"/legacy-user-quests/{HEAVY_USER}/"),
+            ("first page of 100", f"{base}?limit=100"),
+            ("status=completed, 100", f"{base}?limit=100&status=completed"),
+            ("fields=quest_id,status", f"{base}?limit=100&fields=quest_id,status"),
+        ):
+            elapsed, response = timed(client, url, repeat)
+            print(
+                f"{label:<24} {elapsed * 1000:8.2f} ms  {len(response.content):8} bytes"
+            )
+
+        start = time.perf_counter()
+        walked = walk_pages(client, f"{base}?limit=1000")
+        elapsed = time.perf_counter() - start
+        print(f"{'walk all, pages of 1000':<24} {elapsed * 1000:8.2f} ms")
+        keys = [(row["date"], row["quest_id"]) for row in walked]
+        assert len(keys) == rows and len(set(keys)) == rows, "rows lost or repeated"
+        assert keys == sorted(keys, reverse=True), "pages out of order"
+        db.close()
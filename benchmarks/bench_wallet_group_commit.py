@@ -0,0 +1,77 @@
+# bench_wallet_group_commit.py
+#
+# Credits gold and diamonds from many threads at once, first with one
+# transaction and commit per call (two UPDATEs and a ledger entry on a pooled
+# connection), then through auth_service's group-commit WalletWriter, and
+# checks the ledger reconciles with the Users balances after both.
+#
+#   python benchmarks/bench_wallet_group_commit.py [threads] [grants_per_thread]
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+USERS = 10
+
+
+def per_call_commit(user_id):
+    with auth.db_pool.connection() as db:
+        db.execute(
+            "UPDATE Users SET diamond = diamond + ? WHERE user_id = ?", (1, user_id)
+        )
+        db.execute("UPDATE Users SET gold = gold + ? WHERE user_id = ?", (2, user_id))
+        db.execute(
+            """
+            INSERT INTO Wallet_Ledger (user_id, gold, diamond, reason)
+            VALUES (?, ?, ?, 'bench')
+            """,
+            (user_id, 2, 1),
+        )
+        db.commit()
+
+
+def group_commit(user_id):
+    auth.wallet_writer.apply([(user_id, 2, 1, "bench", None)])
+
+
+def run(label, credit, threads, grants):
+    def worker(index):
+        for i in range(grants):
+            credit(1 + (index + i) % USERS)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {threads * grants / elapsed:9.0f} grants/s")
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    grants = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        import auth_service as auth
+
+        with auth.db_pool.connection() as db:
+            db.executemany(
+                "INSERT INTO Users (user_name, password, status) VALUES (?, '', 0)",
+                [(f"user{i}",) for i in range(USERS)],
+            )
+            db.commit()
+
+        run("per-call commit", per_call_commit, threads, grants)
+        auth.wallet_writer.start()
+        try:
+            run("group commit", group_commit, threads, grants)
+        finally:
+            auth.wallet_writer.stop()
+        with auth.db_pool.connection() as db:
+            assert not auth.find_wallet_mismatches(db), "ledger out of step"
+        print(auth.wallet_writer.stats())
+        auth.db_pool.close()
@@ -0,0 +1,181 @@
+# database.py
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import anyio
+
+# Connection settings shared by every service database
+BUSY_TIMEOUT_MS = 5000  # wait this long for the write lock before "database is locked"
+CACHE_SIZE_KB = 20000  # page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024
+STATEMENT_CACHE_SIZE = 256  # prepared statements kept per connection
+
+DEFAULT_POOL_SIZE = 20
+DEFAULT_CHECKOUT_TIMEOUT = 10.0  # seconds to wait for a free connection
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Opens a connection to ``path`` with the shared pragmas applied."""
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.row_factory = sqlite3.Row  # Enables name-based access to columns
+    # WAL lets readers proceed while a single writer commits
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # NORMAL is durable across application crashes in WAL mode and skips an
+    # fsync per commit
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+class ConnectionPool:
+    """A bounded pool of SQLite connections to one database file.
+
+    Connections are opened lazily up to ``max_size``. A checked-out connection
+    belongs to a single request until it is returned, so it is never shared
+    between threads at the same time; callers beyond ``max_size`` wait for one
+    to be returned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_CHECKOUT_TIMEOUT,
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._acquire_limiter = None
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "checkout_time": 0.0,
+            "max_checkout_time": 0.0,
+            "timeouts": 0,
+            "discarded": 0,
+        }
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.max_size:
+                self._opened += 1
+                opened = True
+            else:
+                opened = False
+        if opened:
+            try:
+                return connect(self.path)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise sqlite3.OperationalError(
+                f"Timed out waiting for a connection to {self.path}"
+            )
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["wait_time"] += waited
+            self._stats["max_wait_time"] = max(self._stats["max_wait_time"], waited)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        try:
+            # Never hand the next request a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+                self._stats["discarded"] += 1
+            return
+        self._idle.put(conn)
+
+    def _checkin(self, conn: sqlite3.Connection, held: float):
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["checkout_time"] += held
+            self._stats["max_checkout_time"] = max(
+                self._stats["max_checkout_time"], held
+            )
+        self._release(conn)
+
+    @contextmanager
+    def connection(self):
+        """Checks a connection out for the duration of the ``with`` block."""
+        conn = self._acquire()
+        start = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn, time.perf_counter() - start)
+
+    async def get_db(self):
+        """FastAPI dependency yielding a pooled connection.
+
+        Requests waiting for a connection block on threads from a dedicated
+        limiter. If they used Starlette's threadpool instead, a burst of
+        waiters could occupy every worker thread. The sync endpoints that
+        already hold connections could then never run to return them.
+        """
+        if self._acquire_limiter is None:
+            self._acquire_limiter = anyio.CapacityLimiter(self.max_size)
+        conn = await anyio.to_thread.run_sync(
+            self._acquire, limiter=self._acquire_limiter
+        )
+        start = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn, time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["opened"] = self._opened
+        stats["idle"] = self._idle.qsize()
+        stats["max_size"] = self.max_size
+        checkouts = stats["checkouts"] or 1
+        stats["avg_checkout_time"] = stats["checkout_time"] / checkouts
+        stats["avg_wait_time"] = stats["wait_time"] / (stats["waits"] or 1)
+        return stats
+
+    def close(self):
+        """Closes all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
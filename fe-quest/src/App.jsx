@@ -85,7 +85,9 @@ function App() {
 
   const fetchQuests = async () => {
     try {
-      const response = await axios.get(`${QUEST_CATALOG_URL}/quests/`);
+      const response = await axios.get(`${QUEST_CATALOG_URL}/quests/`, {
+        params: { expand: "reward" },
+      });
       setQuests(response.data);
     } catch (error) {
       console.error(
@@ -126,10 +128,18 @@ function App() {
       return;
     }
     try {
-      const response = await axios.get(
-        `${QUEST_PROCESSING_URL}/user-quests/${user.user_id}/`
-      );
-      setUserQuests(response.data);
+      // Quests come a page at a time; X-Next-Cursor asks for the next one
+      const quests = [];
+      let cursor;
+      do {
+        const response = await axios.get(
+          `${QUEST_PROCESSING_URL}/user-quests/${user.user_id}/`,
+          { params: { cursor } }
+        );
+        quests.push(...response.data);
+        cursor = response.headers["x-next-cursor"];
+      } while (cursor);
+      setUserQuests(quests);
     } catch (error) {
       console.error(
         "Error fetching user quests:",
@@ -344,7 +354,8 @@ function App() {
                           <br />
                           {quest.streak} times needed
                           <br />
-                          Reward: {quest.reward_qty} {quest.reward_item}
+                          Reward: {quest.reward?.reward_qty}{" "}
+                          {quest.reward?.reward_item}
                         </td>
                         <td className="px-4 py-2">
                           <button
@@ -7,10 +7,18 @@ const QuestStatus = ({ userId }) => {
   useEffect(() => {
     const fetchQuests = async () => {
       try {
-        const response = await axios.get(
-          `http://localhost:8003/user-quests/${userId}`
-        );
-        setQuests(response.data);
+        // Quests come a page at a time; X-Next-Cursor asks for the next one
+        const quests = [];
+        let cursor;
+        do {
+          const response = await axios.get(
+            `http://localhost:8003/user-quests/${userId}`,
+            { params: { cursor } }
+          );
+          quests.push(...response.data);
+          cursor = response.headers["x-next-cursor"];
+        } while (cursor);
+        setQuests(quests);
       } catch (error) {
         console.error("Error fetching quest status:", error);
       }
@@ -11,20 +11,35 @@ const QuestManagement = () => {
   const [autoClaim, setAutoClaim] = useState(false);
   const [streak, setStreak] = useState(0);
   const [duplication, setDuplication] = useState(0);
+  // Event that advances the quest; sign-ins are the only events sent today
+  const [triggerEvent, setTriggerEvent] = useState("sign_in");
+  const [search, setSearch] = useState("");
+  const [searchTotal, setSearchTotal] = useState(null);
 
   const axiosInstance = axios.create({
     baseURL: "http://localhost:8000",
   });
 
   useEffect(() => {
-    fetchQuests();
-  }, []);
+    // Wait for a pause in typing before searching
+    const timer = setTimeout(() => fetchQuests(search), 250);
+    return () => clearTimeout(timer);
+  }, [search]);
 
-  const fetchQuests = async () => {
+  const fetchQuests = async (query = search) => {
     try {
-      const response = await axiosInstance.get("/quests");
-      if (Array.isArray(response.data)) {
-        setQuests(response.data);
+      if (query.trim()) {
+        const response = await axiosInstance.get("/quests/search", {
+          params: { q: query, limit: 50 },
+        });
+        setQuests(response.data.quests);
+        setSearchTotal(response.data.total);
+      } else {
+        const response = await axiosInstance.get("/quests");
+        if (Array.isArray(response.data)) {
+          setQuests(response.data);
+        }
+        setSearchTotal(null);
       }
     } catch (error) {
       console.error("Error fetching quests:", error);
@@ -40,6 +55,7 @@ const QuestManagement = () => {
         duplication: parseInt(duplication),
         name: questName,
         description: questDescription,
+        trigger: { event_type: triggerEvent, predicates: {} },
       });
       setQuestName("");
       setQuestDescription("");
@@ -47,6 +63,7 @@ const QuestManagement = () => {
       setAutoClaim(false);
       setStreak(0);
       setDuplication(0);
+      setTriggerEvent("sign_in");
       fetchQuests();
     } catch (error) {
       console.error("Error adding quest:", error);
@@ -99,6 +116,13 @@ const QuestManagement = () => {
           placeholder="Duplication"
           className="border rounded-md p-2 mr-2"
         />
+        <input
+          type="text"
+          value={triggerEvent}
+          onChange={(e) => setTriggerEvent(e.target.value)}
+          placeholder="Trigger Event"
+          className="border rounded-md p-2 mr-2"
+        />
         <button
           onClick={addQuest}
           className="bg-green-500 text-white p-2 rounded-md"
@@ -106,6 +130,20 @@ const QuestManagement = () => {
           Add Quest
         </button>
       </div>
+      <div className="mb-4">
+        <input
+          type="search"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+          placeholder="Search quests"
+          className="border rounded-md p-2 mr-2"
+        />
+        {searchTotal !== null && (
+          <span>
+            Showing {quests.length} of {searchTotal} matching quests
+          </span>
+        )}
+      </div>
       {quests.length > 0 ? (
         <ul className="list-disc pl-5">
           {quests.map((quest) => (
@@ -1,10 +1,521 @@
 # api_gateway.py
 
+import hashlib
+import itertools
+import json
+import os
+import re
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
+import jwt
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.background import BackgroundTask
+
+# Define the service URLs (each service is a pool of one or more replicas)
+SERVICES = {
+    "auth": ["http://localhost:8001"],
+    "quest_catalog": ["http://localhost:8002"],
+    "quest_processing": ["http://localhost:8003"],
+}
+
+# Path prefix -> service; the longest matching prefix wins
+ROUTES = {
+    "/signup": "auth",
+    "/login": "auth",
+    "/users": "auth",
+    "/quests": "quest_catalog",
+    "/rewards": "quest_catalog",
+    "/catalog": "quest_catalog",
+    "/assign-quest": "quest_processing",
+    "/user-quests": "quest_processing",
+    "/complete-quest": "quest_processing",
+    "/claim-quest": "quest_processing",
+}
+
+# Optional JSON file overriding SERVICES/ROUTES, re-read on POST /_gateway/reload:
+# {"services": {"quest_processing": {"replicas": [...], "balancing": "least_outstanding"}},
+#  "routes": {"/quests": "quest_catalog"}}
+GATEWAY_CONFIG_PATH = "gateway_config.json"
+
+# Requests under this prefix are served by the gateway itself
+GATEWAY_ADMIN_PREFIX = "/_gateway"
+
+# Load balancing and passive health checking
+DEFAULT_BALANCING = "round_robin"  # or "least_outstanding"
+EJECT_AFTER_FAILURES = 3  # consecutive failures before a replica is ejected
+EJECT_SECONDS = 30.0  # how long an ejected replica is skipped
+UNHEALTHY_STATUS_CODES = {502, 503, 504}
+
+# GET response cache: path prefix -> TTL in seconds
+CACHE_ROUTES = {
+    "/quests": 30.0,
+    "/rewards": 30.0,
+}
+CACHE_MAX_ENTRIES = 1024
+CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Larger responses are streamed but never cached or shared between requests
+CACHE_MAX_ENTRY_BYTES = 1024 * 1024
+
+# Coalescing of identical in-flight GETs: path prefix -> max waiters per flight.
+# Requests beyond the cap go upstream on their own.
+COALESCE_ROUTES = {
+    "/quests": 1000,
+    "/rewards": 1000,
+    "/users": 1000,
+    "/user-quests": 1000,
+}
+
+# Edge authentication; the secret must match auth_service.SECRET_KEY
+SECRET_KEY = "your_secret_key"  # Replace with a secure secret key in production
+# Routes that reject requests without a valid bearer token. Tokens sent to any
+# other route are still verified and resolved.
+AUTH_REQUIRED_ROUTES = ["/user-quests", "/complete-quest", "/claim-quest"]
+# Verified user id forwarded upstream; any client-supplied copy is dropped
+TRUSTED_USER_HEADER = "x-user-id"
+# Operator-only endpoints under public routes; the gateway answers 404 for them
+# and operators call the service directly
+INTERNAL_ROUTES = ["/assign-quest/bulk", "/assign-quest/jobs"]
+TOKEN_CACHE_SIZE = 10000
+
+# Upstream connection pool settings (one pooled client per replica)
+UPSTREAM_MAX_CONNECTIONS = 100
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = 20
+UPSTREAM_KEEPALIVE_EXPIRY = 30.0  # seconds an idle connection is kept open
+UPSTREAM_CONNECT_TIMEOUT = 5.0
+UPSTREAM_READ_TIMEOUT = 30.0
+UPSTREAM_HTTP2 = False  # requires the optional "h2" package
+
+# Headers that describe a single connection and must not be forwarded (RFC 9110)
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "proxy-connection",
+    "te",
+    "trailer",
+    "trailers",
+    "transfer-encoding",
+    "upgrade",
+}
+
+# Methods whose request bodies are streamed upstream
+BODY_METHODS = {"post", "put"}
+
+
+def create_upstream_client(base_url: str) -> httpx.AsyncClient:
+    """Builds a pooled, keep-alive client for a single upstream service."""
+    limits = httpx.Limits(
+        max_connections=UPSTREAM_MAX_CONNECTIONS,
+        max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        UPSTREAM_READ_TIMEOUT,
+        connect=UPSTREAM_CONNECT_TIMEOUT,
+        read=UPSTREAM_READ_TIMEOUT,
+    )
+    http2 = UPSTREAM_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("HTTP/2 requested but 'h2' is not installed; using HTTP/1.1.")
+            http2 = False
+    return httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout, http2=http2
+    )
+
+
+class Replica:
+    """A single upstream instance with its pooled client and health state."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = create_upstream_client(url)
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+class UpstreamPool:
+    """Replicas of one service plus the policy used to pick between them."""
+
+    def __init__(self, name: str, replicas: list, balancing: str = DEFAULT_BALANCING):
+        self.name = name
+        self.replicas = replicas
+        self.balancing = balancing
+        self._counter = itertools.count()
+
+    def choose(self) -> Replica:
+        now = time.monotonic()
+        # Fail open: if every replica is ejected, keep trying all of them
+        candidates = [r for r in self.replicas if r.is_healthy(now)] or self.replicas
+        start = next(self._counter) % len(candidates)
+        rotated = candidates[start:] + candidates[:start]
+        if self.balancing == "least_outstanding":
+            return min(rotated, key=lambda r: r.outstanding)
+        return rotated[0]
+
+    def report(self, replica: Replica, ok: bool):
+        if ok:
+            replica.failures = 0
+            return
+        replica.failures += 1
+        if replica.failures >= EJECT_AFTER_FAILURES:
+            replica.ejected_until = time.monotonic() + EJECT_SECONDS
+            replica.failures = 0
+            print(f"Ejecting {replica.url} from {self.name} for {EJECT_SECONDS}s")
+
+
+class PrefixMatcher:
+    """Longest-prefix lookup compiled once into a single regular expression."""
 
-app = FastAPI()
+    def __init__(self, mapping: dict):
+        # Alternatives are tried in order, so sorting longest-first makes the
+        # first match the longest prefix
+        prefixes = sorted(mapping, key=len, reverse=True)
+        self._pattern = re.compile("|".join(f"({re.escape(p)})" for p in prefixes))
+        self._values = [mapping[p] for p in prefixes]
+
+    def match(self, path: str):
+        """Returns the value of the longest prefix of ``path``, or None."""
+        m = self._pattern.match(path) if self._values else None
+        return self._values[m.lastindex - 1] if m else None
+
+
+class RouteTable:
+    """Maps request paths to the UpstreamPool of the service that serves them."""
+
+    def __init__(self, routes: dict, pools: dict):
+        self.routes = dict(routes)
+        self.pools = pools
+        self._matcher = PrefixMatcher(routes)
+
+    def match(self, path: str):
+        """Returns the UpstreamPool serving ``path``, or None."""
+        service = self._matcher.match(path)
+        return self.pools[service] if service is not None else None
+
+
+class CacheEntry:
+    def __init__(self, service, status_code, headers, body, etag, expires_at):
+        self.service = service
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU + TTL cache of upstream GET responses, bounded by entries and bytes."""
+
+    def __init__(self, routes: dict, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        # Bumped by every invalidation so that responses fetched before a
+        # write are not stored after it
+        self.generation = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "not_modified": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+        self._ttls = PrefixMatcher(routes)
+
+    def ttl_for(self, path: str):
+        """Returns the TTL configured for ``path``, or None if it is not cacheable."""
+        return self._ttls.match(path)
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, entry: CacheEntry):
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.size += len(entry.body)
+        self.stats["stores"] += 1
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.stats["evictions"] += 1
+
+    def invalidate(self, service: str):
+        """Drops every entry served by ``service``."""
+        self.generation += 1
+        for key in [k for k, e in self.entries.items() if e.service == service]:
+            self._remove(key)
+        self.stats["invalidations"] += 1
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.size -= len(entry.body)
+
+
+response_cache = ResponseCache(CACHE_ROUTES, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES)
+
+
+class Flight:
+    """An upstream GET in progress whose response is shared with identical requests."""
+
+    def __init__(self):
+        self.result = asyncio.get_running_loop().create_future()
+        self.waiters = 0
+
+    def finish(self, result):
+        if not self.result.done():
+            self.result.set_result(result)
+
+
+# In-flight leader requests keyed by cache_key
+in_flight = {}
+coalesce_matcher = PrefixMatcher(COALESCE_ROUTES)
+coalesce_stats = {"leaders": 0, "coalesced": 0, "overflow": 0, "fallbacks": 0}
+
+
+class TokenCache:
+    """LRU of verified tokens keyed by SHA-256, so repeats skip the signature check."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "rejected": 0}
+
+    def verify(self, token: str) -> int:
+        """Returns the token's user_id, raising jwt.InvalidTokenError if it is not valid."""
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = self.entries.get(digest)
+        if cached is not None:
+            user_id, exp = cached
+            if exp > time.time():
+                self.entries.move_to_end(digest)
+                self.stats["hits"] += 1
+                return user_id
+            del self.entries[digest]
+            self.stats["rejected"] += 1
+            raise jwt.ExpiredSignatureError("Signature has expired")
+
+        self.stats["misses"] += 1
+        try:
+            payload = jwt.decode(
+                token, SECRET_KEY, algorithms=["HS256"], options={"require": ["exp"]}
+            )
+        except jwt.InvalidTokenError:
+            self.stats["rejected"] += 1
+            raise
+        user_id = payload.get("user_id")
+        if user_id is None:
+            self.stats["rejected"] += 1
+            raise jwt.InvalidTokenError("Token has no user_id")
+        self.entries[digest] = (user_id, payload["exp"])
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return user_id
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+auth_required_matcher = PrefixMatcher({prefix: True for prefix in AUTH_REQUIRED_ROUTES})
+internal_matcher = PrefixMatcher({prefix: True for prefix in INTERNAL_ROUTES})
+
+
+def authenticate(request: Request):
+    """Resolves the bearer token to a user id.
+
+    Returns ``(user_id, None)`` on success, ``(None, None)`` for a public route
+    without a usable token, and ``(None, error_response)`` for a protected one.
+    """
+    required = auth_required_matcher.match(request.url.path) is not None
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        detail = "Not authenticated"
+    else:
+        try:
+            return token_cache.verify(token.strip()), None
+        except jwt.ExpiredSignatureError:
+            detail = "Token expired"
+        except jwt.InvalidTokenError:
+            detail = "Invalid token"
+    if not required:
+        # A stale token must not block public routes such as /login
+        return None, None
+    return None, JSONResponse(
+        {"detail": detail}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+def cache_key(request: Request) -> str:
+    """Path plus the query string with parameters in a stable order."""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == wanted for tag in if_none_match.split(",")
+    )
+
+
+def buffered_response(status_code: int, headers: list, body: bytes) -> Response:
+    response = Response(content=body, status_code=status_code)
+    response.raw_headers = headers + [
+        (b"content-length", str(len(body)).encode("latin-1"))
+    ]
+    return response
+
+
+def cached_response(request: Request, entry: CacheEntry) -> Response:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, entry.etag):
+        response_cache.stats["not_modified"] += 1
+        response = Response(status_code=304)
+        response.raw_headers = [(b"etag", entry.etag.encode("latin-1"))]
+        return response
+    return buffered_response(
+        entry.status_code,
+        entry.headers + [(b"etag", entry.etag.encode("latin-1")), (b"x-cache", b"HIT")],
+        entry.body,
+    )
+
+
+def load_gateway_config() -> tuple:
+    """Reads services and routes from GATEWAY_CONFIG_PATH, falling back to the defaults."""
+    services = {
+        name: {"replicas": urls, "balancing": DEFAULT_BALANCING}
+        for name, urls in SERVICES.items()
+    }
+    routes = dict(ROUTES)
+    if os.path.exists(GATEWAY_CONFIG_PATH):
+        with open(GATEWAY_CONFIG_PATH) as f:
+            config = json.load(f)
+        for name, spec in config.get("services", {}).items():
+            if isinstance(spec, list):
+                spec = {"replicas": spec}
+            services[name] = {
+                "replicas": spec["replicas"],
+                "balancing": spec.get("balancing", DEFAULT_BALANCING),
+            }
+        routes.update(config.get("routes", {}))
+    return services, routes
+
+
+def build_route_table(services: dict, routes: dict, previous=None) -> RouteTable:
+    """Compiles a RouteTable, reusing replicas (and their clients) from ``previous``."""
+    # Validate everything before any client is opened
+    for name, spec in services.items():
+        if spec["balancing"] not in ("round_robin", "least_outstanding"):
+            raise ValueError(
+                f"Unknown balancing policy '{spec['balancing']}' for {name}"
+            )
+        if not spec["replicas"]:
+            raise ValueError(f"Service {name} has no replicas")
+    for prefix, service in routes.items():
+        if service not in services:
+            raise ValueError(f"Route {prefix} points at unknown service {service}")
+
+    existing = {}
+    if previous is not None:
+        for pool in previous.pools.values():
+            for replica in pool.replicas:
+                existing[replica.url] = replica
+    pools = {}
+    for name, spec in services.items():
+        replicas = [existing.get(url) or Replica(url) for url in spec["replicas"]]
+        pools[name] = UpstreamPool(name, replicas, spec["balancing"])
+    return RouteTable(routes, pools)
+
+
+def all_replicas(table: RouteTable) -> dict:
+    return {r.url: r for pool in table.pools.values() for r in pool.replicas}
+
+
+# Active route table; swapped atomically on reload
+route_table = None
+
+
+async def reload_route_table() -> RouteTable:
+    """Re-reads the gateway config and swaps in a freshly compiled route table."""
+    global route_table
+    services, routes = load_gateway_config()
+    previous = route_table
+    route_table = build_route_table(services, routes, previous)
+    if previous is not None:
+        removed = [
+            replica
+            for url, replica in all_replicas(previous).items()
+            if url not in all_replicas(route_table)
+        ]
+        if removed:
+            asyncio.create_task(close_replicas_later(removed))
+    return route_table
+
+
+async def close_replicas_later(replicas: list):
+    """Closes removed replicas once requests already in flight have had time to finish."""
+    await asyncio.sleep(UPSTREAM_READ_TIMEOUT)
+    for replica in replicas:
+        await replica.client.aclose()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global route_table
+    await reload_route_table()
+    try:
+        yield
+    finally:
+        for replica in all_replicas(route_table).values():
+            await replica.client.aclose()
+        route_table = None
+
+
+def filter_headers(raw_headers, extra=()) -> list:
+    """Drops hop-by-hop headers, including any named in the Connection header."""
+    excluded = HOP_BY_HOP_HEADERS | set(extra)
+    for key, value in raw_headers:
+        if key.lower() == b"connection":
+            excluded |= {
+                token.strip().lower() for token in value.decode("latin-1").split(",")
+            }
+    return [
+        (key, value)
+        for key, value in raw_headers
+        if key.decode("latin-1").lower() not in excluded
+    ]
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS as needed
 app.add_middleware(
@@ -15,13 +526,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Define the service URLs
-SERVICES = {
-    "auth": "http://localhost:8001",
-    "quest_catalog": "http://localhost:8002",
-    "quest_processing": "http://localhost:8003",
-}
-
 
 @app.middleware("http")
 async def proxy_requests(request: Request, call_next):
@@ -40,53 +544,226 @@ async def proxy_requests(request: Request, call_next):
             content="",
         )
 
+    if path.startswith(GATEWAY_ADMIN_PREFIX):
+        return await call_next(request)
+
     # Determine which service to route to based on the path
-    if (
-        path.startswith("/signup")
-        or path.startswith("/login")
-        or path.startswith("/users")
-    ):
-        target_url = SERVICES["auth"] + path
-    elif path.startswith("/quests"):
-        target_url = SERVICES["quest_catalog"] + path
-    elif (
-        path.startswith("/assign-quest")
-        or path.startswith("/user-quests")
-        or path.startswith("/complete-quest")
-    ):
-        target_url = SERVICES["quest_processing"] + path
-    else:
+    pool = route_table.match(path)
+    if pool is None or internal_matcher.match(path) is not None:
         return Response(content="Not Found", status_code=404)
 
-    async with httpx.AsyncClient() as client:
-        try:
-            if method == "get":
-                resp = await client.get(
-                    target_url,
-                    params=request.query_params,
-                    headers=dict(request.headers),
-                )
-            elif method == "post":
-                body = await request.body()
-                resp = await client.post(
-                    target_url, content=body, headers=dict(request.headers)
-                )
-            elif method == "put":
-                body = await request.body()
-                resp = await client.put(
-                    target_url, content=body, headers=dict(request.headers)
+    if method not in {"get", "post", "put", "delete"}:
+        return Response(content="Method Not Allowed", status_code=405)
+
+    # Verify the bearer token once at the edge; upstreams trust the forwarded id
+    user_id, error = authenticate(request)
+    if error is not None:
+        return error
+    # The client's Host is kept, so upstream redirects point back at the gateway
+    upstream_headers = filter_headers(request.headers.raw, extra=(TRUSTED_USER_HEADER,))
+    if user_id is not None:
+        upstream_headers.append(
+            (TRUSTED_USER_HEADER.encode("latin-1"), str(user_id).encode("latin-1"))
+        )
+
+    cache_ttl = response_cache.ttl_for(path) if method == "get" else None
+    if cache_ttl is not None:
+        key = cache_key(request)
+        entry = response_cache.get(key)
+        if entry is not None:
+            return cached_response(request, entry)
+        generation = response_cache.generation
+
+    # Single-flight: identical concurrent GETs wait for one leader's response
+    flight = None
+    max_waiters = coalesce_matcher.match(path) if method == "get" else None
+    if max_waiters is not None:
+        flight_key = cache_key(request)
+        if auth_required_matcher.match(path) is not None:
+            # Per-user routes only share a response between the same user's calls
+            flight_key = f"{flight_key}#user={user_id}"
+        leader = in_flight.get(flight_key)
+        if leader is None:
+            flight = in_flight[flight_key] = Flight()
+            coalesce_stats["leaders"] += 1
+        elif leader.waiters < max_waiters:
+            leader.waiters += 1
+            coalesce_stats["coalesced"] += 1
+            try:
+                shared = await asyncio.wait_for(
+                    asyncio.shield(leader.result), UPSTREAM_READ_TIMEOUT
                 )
-            elif method == "delete":
-                resp = await client.delete(target_url, headers=dict(request.headers))
-            else:
-                return Response(content="Method Not Allowed", status_code=405)
-        except httpx.RequestError as e:
-            return Response(content=str(e), status_code=500)
-
-    # Prepare the response to return to the client
-    return Response(
-        content=resp.content, status_code=resp.status_code, headers=resp.headers
+            except asyncio.TimeoutError:
+                # The leader's response was never relayed; retire the flight
+                leader.finish(None)
+                if in_flight.get(flight_key) is leader:
+                    del in_flight[flight_key]
+                shared = None
+            finally:
+                leader.waiters -= 1
+            if shared is not None:
+                return buffered_response(*shared)
+            # The leader failed or its body was too large to share
+            coalesce_stats["fallbacks"] += 1
+        else:
+            coalesce_stats["overflow"] += 1
+
+    def finish_flight(result):
+        if flight is not None:
+            flight.finish(result)
+            if in_flight.get(flight_key) is flight:
+                del in_flight[flight_key]
+
+    replica = pool.choose()
+    client = replica.client
+    upstream_request = client.build_request(
+        method.upper(),
+        path,
+        params=request.query_params,
+        headers=upstream_headers,
+        content=request.stream() if method in BODY_METHODS else None,
+    )
+    replica.outstanding += 1
+    try:
+        resp = await client.send(upstream_request, stream=True)
+    except httpx.RequestError as e:
+        replica.outstanding -= 1
+        pool.report(replica, ok=False)
+        finish_flight(None)
+        return Response(content=str(e), status_code=500)
+    pool.report(replica, ok=resp.status_code not in UNHEALTHY_STATUS_CODES)
+
+    if method != "get" and resp.status_code < 400:
+        # A successful write may have changed anything this service serves
+        response_cache.invalidate(pool.name)
+
+    headers = filter_headers(resp.headers.raw)
+    store = (
+        cache_ttl is not None
+        and resp.status_code == 200
+        and "no-store" not in resp.headers.get("cache-control", "")
+    )
+
+    released = False
+
+    async def release():
+        nonlocal released
+        finish_flight(None)
+        if not released:
+            released = True
+            replica.outstanding -= 1
+            await resp.aclose()
+
+    collect = store or flight is not None
+
+    async def relay():
+        try:
+            chunks = []
+            size = 0
+            async for chunk in resp.aiter_raw():
+                if collect and size <= CACHE_MAX_ENTRY_BYTES:
+                    chunks.append(chunk)
+                    size += len(chunk)
+                yield chunk
+            if collect and size <= CACHE_MAX_ENTRY_BYTES:
+                body = b"".join(chunks)
+                # A 304 only answers the leader's own If-None-Match; waiters
+                # fall back to their own upstream call instead
+                if resp.status_code != 304:
+                    # Waiters get a fresh content-length from buffered_response
+                    shared_headers = [
+                        (k, v)
+                        for k, v in headers
+                        if k.lower() not in (b"content-length", b"transfer-encoding")
+                    ]
+                    finish_flight((resp.status_code, shared_headers, body))
+                if store:
+                    save_to_cache(body)
+        finally:
+            # Waiters fall back to their own upstream call if we never finished
+            await release()
+
+    def save_to_cache(body: bytes):
+        if response_cache.generation != generation:
+            return
+        etag = resp.headers.get("etag") or f'"{hashlib.sha1(body).hexdigest()}"'
+        stored_headers = [
+            (k, v) for k, v in headers if k.lower() not in (b"content-length", b"etag")
+        ]
+        response_cache.put(
+            key,
+            CacheEntry(
+                pool.name,
+                resp.status_code,
+                stored_headers,
+                body,
+                etag,
+                time.monotonic() + cache_ttl,
+            ),
+        )
+
+    # Relay the upstream body chunk by chunk; the connection is released once
+    # the client has consumed it (or disconnected)
+    response = StreamingResponse(
+        relay(),
+        status_code=resp.status_code,
+        background=BackgroundTask(release),
     )
+    # Keep repeated headers such as Set-Cookie intact
+    response.raw_headers = headers
+    if cache_ttl is not None:
+        response.raw_headers = headers + [(b"x-cache", b"MISS")]
+    return response
+
+
+@app.post(GATEWAY_ADMIN_PREFIX + "/reload")
+async def reload_config():
+    """Reloads services and routes from GATEWAY_CONFIG_PATH without a restart."""
+    try:
+        table = await reload_route_table()
+    except (ValueError, KeyError, json.JSONDecodeError) as e:
+        return Response(content=f"Invalid gateway config: {e}", status_code=400)
+    return {"routes": table.routes}
+
+
+@app.get(GATEWAY_ADMIN_PREFIX + "/upstreams")
+async def get_upstreams():
+    now = time.monotonic()
+    return {
+        name: {
+            "balancing": pool.balancing,
+            "replicas": [
+                {
+                    "url": r.url,
+                    "outstanding": r.outstanding,
+                    "healthy": r.is_healthy(now),
+                }
+                for r in pool.replicas
+            ],
+        }
+        for name, pool in route_table.pools.items()
+    }
+
+
+@app.get(GATEWAY_ADMIN_PREFIX + "/cache")
+async def get_cache_stats():
+    return {
+        **response_cache.stats,
+        "entries": len(response_cache.entries),
+        "bytes": response_cache.size,
+        "max_entries": response_cache.max_entries,
+        "max_bytes": response_cache.max_bytes,
+    }
+
+
+@app.get(GATEWAY_ADMIN_PREFIX + "/auth")
+async def get_auth_stats():
+    return {**token_cache.stats, "cached_tokens": len(token_cache.entries)}
+
+
+@app.get(GATEWAY_ADMIN_PREFIX + "/coalescing")
+async def get_coalescing_stats():
+    return {**coalesce_stats, "in_flight": len(in_flight)}
 
 
 if __name__ == "__main__":
@@ -1,12 +1,72 @@
 # quest_catalog_service.py
 
+import asyncio
+import hashlib
+import itertools
+import json
+import re
 import sqlite3
-from fastapi import FastAPI, HTTPException, Depends
+import threading
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
 
-app = FastAPI()
+from database import ConnectionPool, connect
+
+db_pool = ConnectionPool("quest_catalog.db")
+
+# Comparisons a trigger predicate may apply to an event attribute
+PREDICATE_OPERATORS = {"eq", "ne", "lt", "lte", "gt", "gte", "in"}
+
+# Change feed
+CHANGE_LOG_RETENTION = 10000  # newest Catalog_Changes entries kept
+CHANGES_PAGE_MAX = 500  # entries per /changes response
+CHANGES_POLL_TIMEOUT = 30.0  # default seconds a /changes long-poll waits
+CHANGES_POLL_MAX = 60.0
+CHANGES_KEEPALIVE = 15.0  # seconds between comments on an idle SSE stream
+
+# Seconds between checks for catalog writes made by other processes
+# (replicas or workers sharing quest_catalog.db)
+SNAPSHOT_POLL_INTERVAL = 1.0
+
+# Most ids one ?ids= lookup may ask for
+BATCH_LOOKUP_MAX = 500
+
+# Quest search
+SEARCH_PAGE_DEFAULT = 20
+SEARCH_PAGE_MAX = 100
+SEARCH_NAME_WEIGHT = 10.0  # bm25 weight of a name match relative to description
+
+# Bulk import
+IMPORT_MAX_ROWS = 50000
+NDJSON_MEDIA_TYPES = {"application/x-ndjson", "application/jsonl"}
+
+# Set while serving; refresh_snapshot uses them to wake change-feed waiters
+event_loop = None
+changes_event = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global event_loop, changes_event
+    event_loop = asyncio.get_running_loop()
+    changes_event = asyncio.Event()
+    follower = asyncio.create_task(follow_other_writers())
+    try:
+        yield
+    finally:
+        follower.cancel()
+        with suppress(asyncio.CancelledError):
+            await follower
+        event_loop = None
+        db_pool.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,17 +77,13 @@ app.add_middleware(
 )
 
 
-def get_db():
-    conn = sqlite3.connect("quest_catalog.db", check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    try:
+async def get_db():
+    async for conn in db_pool.get_db():
         yield conn
-    finally:
-        conn.close()
 
 
 def init_db():
-    conn = sqlite3.connect("quest_catalog.db")
+    conn = connect("quest_catalog.db")
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -49,10 +105,78 @@ def init_db():
             duplication INTEGER NOT NULL,
             name TEXT NOT NULL,
             description TEXT NOT NULL,
+            trigger_event TEXT, -- event type that advances the quest
+            trigger_predicates TEXT, -- JSON object of attribute conditions
             FOREIGN KEY (reward_id) REFERENCES Rewards(reward_id)
         );
         """
     )
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(Quests)")}
+    if "trigger_event" not in columns:
+        cursor.execute("ALTER TABLE Quests ADD COLUMN trigger_event TEXT")
+        cursor.execute("ALTER TABLE Quests ADD COLUMN trigger_predicates TEXT")
+        # Sign-ins used to find their quests by a "Sign In" substring in the name
+        cursor.execute(
+            "UPDATE Quests SET trigger_event = 'sign_in' WHERE instr(name, 'Sign In') > 0"
+        )
+    # Every write to Quests or Rewards appends the entity's new state here
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Catalog_Changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            entity TEXT NOT NULL, -- "quest" or "reward"
+            entity_id INTEGER NOT NULL,
+            op TEXT NOT NULL, -- "upsert" or "delete"
+            data TEXT, -- JSON of the entity after the write; NULL for deletes
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
+    # Full-text index over quest names and descriptions, kept in step with
+    # Quests by the triggers below. It stores no copy of the text.
+    indexed = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'Quests_Search'"
+    ).fetchone()
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS Quests_Search USING fts5(
+            name, description,
+            content = 'Quests', content_rowid = 'quest_id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS quests_search_insert AFTER INSERT ON Quests BEGIN
+            INSERT INTO Quests_Search (rowid, name, description)
+            VALUES (new.quest_id, new.name, new.description);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS quests_search_delete AFTER DELETE ON Quests BEGIN
+            INSERT INTO Quests_Search (Quests_Search, rowid, name, description)
+            VALUES ('delete', old.quest_id, old.name, old.description);
+        END;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS quests_search_update
+        AFTER UPDATE OF name, description ON Quests BEGIN
+            INSERT INTO Quests_Search (Quests_Search, rowid, name, description)
+            VALUES ('delete', old.quest_id, old.name, old.description);
+            INSERT INTO Quests_Search (rowid, name, description)
+            VALUES (new.quest_id, new.name, new.description);
+        END;
+        """
+    )
+    if not indexed:
+        # Index quests created before the search index existed
+        cursor.execute("INSERT INTO Quests_Search (Quests_Search) VALUES ('rebuild')")
     conn.commit()
     conn.close()
 
@@ -78,6 +202,12 @@ class Reward(RewardBase):
         orm_mode = True
 
 
+class QuestTrigger(BaseModel):
+    event_type: str
+    # attribute -> value to equal, or -> {operator: value}
+    predicates: Dict[str, Any] = {}
+
+
 class QuestBase(BaseModel):
     reward_id: int
     auto_claim: bool
@@ -85,6 +215,7 @@ class QuestBase(BaseModel):
     duplication: int
     name: str
     description: str
+    trigger: Optional[QuestTrigger] = None
 
 
 class QuestCreate(QuestBase):
@@ -98,6 +229,7 @@ class QuestUpdate(BaseModel):
     duplication: Optional[int] = None
     name: Optional[str] = None
     description: Optional[str] = None
+    trigger: Optional[QuestTrigger] = None
 
 
 class Quest(QuestBase):
@@ -107,6 +239,387 @@ class Quest(QuestBase):
         orm_mode = True
 
 
+class QuestWithReward(Quest):
+    reward: Optional[Reward] = None  # None if the reward no longer exists
+
+
+class RewardImport(RewardCreate):
+    reward_id: Optional[int] = None  # a new reward if omitted
+    ref: Optional[str] = None  # name quests in the same import refer to it by
+
+
+class QuestImport(QuestBase):
+    reward_id: Optional[int] = None  # an existing reward, or one in the import
+    reward_ref: Optional[str] = None  # ref of a reward in the same import
+    quest_id: Optional[int] = None  # a new quest if omitted
+    ref: Optional[str] = None  # echoed back with the quest_id it was given
+
+
+# "type" of an import row -> its model
+IMPORT_MODELS = {"reward": RewardImport, "quest": QuestImport}
+
+
+def validate_trigger(trigger: Optional[QuestTrigger]):
+    if trigger is None:
+        return
+    for attribute, condition in trigger.predicates.items():
+        if isinstance(condition, dict):
+            unknown = set(condition) - PREDICATE_OPERATORS
+            if unknown:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown operators for '{attribute}': {sorted(unknown)}",
+                )
+            if "in" in condition and not isinstance(condition["in"], list):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"'in' for '{attribute}' must be a list",
+                )
+
+
+def default_trigger(name: str, trigger: Optional[QuestTrigger]):
+    """Gives a quest created without a trigger the one init_db's migration
+    would: sign_in for "Sign In" quests. Others stay without one."""
+    if trigger is None and "Sign In" in name:
+        return QuestTrigger(event_type="sign_in")
+    return trigger
+
+
+def trigger_columns(trigger: Optional[QuestTrigger]) -> tuple:
+    """Returns the (trigger_event, trigger_predicates) column values."""
+    if trigger is None:
+        return None, None
+    return trigger.event_type, json.dumps(trigger.predicates)
+
+
+def quest_dict(row: sqlite3.Row) -> dict:
+    """Returns a Quests row in the JSON shape of Quest."""
+    trigger = None
+    if row["trigger_event"] is not None:
+        trigger = {
+            "event_type": row["trigger_event"],
+            "predicates": json.loads(row["trigger_predicates"] or "{}"),
+        }
+    return {
+        "reward_id": row["reward_id"],
+        "auto_claim": bool(row["auto_claim"]),
+        "streak": row["streak"],
+        "duplication": row["duplication"],
+        "name": row["name"],
+        "description": row["description"],
+        "trigger": trigger,
+        "quest_id": row["quest_id"],
+    }
+
+
+def reward_dict(row: sqlite3.Row) -> dict:
+    """Returns a Rewards row in the JSON shape of Reward."""
+    return {
+        "reward_name": row["reward_name"],
+        "reward_item": row["reward_item"],
+        "reward_qty": row["reward_qty"],
+        "reward_id": row["reward_id"],
+    }
+
+
+def quest_from_row(row: sqlite3.Row) -> Quest:
+    return Quest(**quest_dict(row))
+
+
+class Encoded(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def encoded_body(body: bytes) -> Encoded:
+    # Derived from the content, so ETags stay valid across restarts
+    return Encoded(body, f'"{hashlib.sha1(body).hexdigest()}"')
+
+
+def encode(content) -> Encoded:
+    # Same encoding as FastAPI's JSONResponse
+    return encoded_body(
+        json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    )
+
+
+def encode_list(items: List[Encoded]) -> Encoded:
+    """Joins already-encoded items into a JSON array without re-encoding them."""
+    return encoded_body(b"[" + b",".join(item.body for item in items) + b"]")
+
+
+class CatalogSnapshot:
+    """An immutable copy of the catalog with every read response pre-encoded.
+
+    Built once per version of the catalog. Reads serve its bytes as they are,
+    without a query or a model validation pass.
+    """
+
+    def __init__(
+        self, version: int, last_seq: int, quests: List[dict], rewards: List[dict]
+    ):
+        self.version = version
+        self.last_seq = last_seq  # newest Catalog_Changes entry it includes
+        self.quests = {quest["quest_id"]: encode(quest) for quest in quests}
+        self.rewards = {reward["reward_id"]: encode(reward) for reward in rewards}
+        # Quests joined with their reward, for ?expand=reward
+        rewards_by_id = {reward["reward_id"]: reward for reward in rewards}
+        self.quests_with_reward = {
+            quest["quest_id"]: encode(
+                dict(quest, reward=rewards_by_id.get(quest["reward_id"]))
+            )
+            for quest in quests
+        }
+        self.quest_list = encode_list(self.quests.values())
+        self.quest_list_with_reward = encode_list(self.quests_with_reward.values())
+        self.reward_list = encode_list(self.rewards.values())
+
+
+catalog_snapshot = None
+snapshot_lock = threading.Lock()
+
+
+def refresh_snapshot(db: sqlite3.Connection):
+    """Replaces the snapshot with the database's current catalog.
+
+    Call after every committed write. Rebuilds are serialized, so the last one
+    to finish has read the latest commit.
+    """
+    global catalog_snapshot
+    with snapshot_lock:
+        # One read transaction, so quests and rewards come from the same commit
+        db.execute("BEGIN")
+        try:
+            quests = db.execute("SELECT * FROM Quests ORDER BY quest_id").fetchall()
+            rewards = db.execute("SELECT * FROM Rewards ORDER BY reward_id").fetchall()
+            last_seq = db.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM Catalog_Changes"
+            ).fetchone()[0]
+        finally:
+            db.commit()
+        version = catalog_snapshot.version + 1 if catalog_snapshot else 1
+        # Readers see either the old snapshot or the new one, never a mix
+        catalog_snapshot = CatalogSnapshot(
+            version,
+            last_seq,
+            [quest_dict(row) for row in quests],
+            [reward_dict(row) for row in rewards],
+        )
+    if event_loop is not None:
+        event_loop.call_soon_threadsafe(wake_change_waiters)
+
+
+def latest_change_seq() -> int:
+    with db_pool.connection() as db:
+        return db.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM Catalog_Changes"
+        ).fetchone()[0]
+
+
+def rebuild_snapshot():
+    with db_pool.connection() as db:
+        refresh_snapshot(db)
+
+
+async def follow_other_writers():
+    """Rebuilds the snapshot after writes this process did not make.
+
+    Every write appends to Catalog_Changes, so a newer MAX(seq) than the
+    snapshot's means another process sharing the database has written.
+    The rebuild also wakes this process's change-feed waiters.
+    """
+    while True:
+        await asyncio.sleep(SNAPSHOT_POLL_INTERVAL)
+        try:
+            if await run_in_threadpool(latest_change_seq) > catalog_snapshot.last_seq:
+                await run_in_threadpool(rebuild_snapshot)
+        except Exception as e:
+            print(f"Catalog snapshot check failed: {e}")
+
+
+def wake_change_waiters():
+    """Releases every request waiting on the change feed; runs on the event loop."""
+    global changes_event
+    changes_event.set()
+    changes_event = asyncio.Event()
+
+
+# entity -> (table, key column, JSON shape)
+CHANGE_ENTITIES = {
+    "quest": ("Quests", "quest_id", quest_dict),
+    "reward": ("Rewards", "reward_id", reward_dict),
+}
+
+
+def record_change(cursor: sqlite3.Cursor, entity: str, entity_id: int):
+    """Appends the entity's state after a write to the change log.
+
+    Call in the writing transaction, before it commits, so the log and the
+    tables never disagree.
+    """
+    table, key, to_dict = CHANGE_ENTITIES[entity]
+    cursor.execute(f"SELECT * FROM {table} WHERE {key} = ?", (entity_id,))
+    row = cursor.fetchone()
+    cursor.execute(
+        """
+        INSERT INTO Catalog_Changes (entity, entity_id, op, data)
+        VALUES (?, ?, ?, ?)
+        """,
+        (
+            entity,
+            entity_id,
+            "delete" if row is None else "upsert",
+            None if row is None else json.dumps(to_dict(row)),
+        ),
+    )
+    cursor.execute(
+        "DELETE FROM Catalog_Changes WHERE seq <= ?",
+        (cursor.lastrowid - CHANGE_LOG_RETENTION,),
+    )
+
+
+def record_changes(cursor: sqlite3.Cursor, entity: str, rows: List[dict]):
+    """Bulk form of record_change for rows just written with these column values."""
+    _, key, to_dict = CHANGE_ENTITIES[entity]
+    cursor.executemany(
+        """
+        INSERT INTO Catalog_Changes (entity, entity_id, op, data)
+        VALUES (?, ?, 'upsert', ?)
+        """,
+        [(entity, row[key], json.dumps(to_dict(row))) for row in rows],
+    )
+    cursor.execute(
+        """
+        DELETE FROM Catalog_Changes
+        WHERE seq <= (SELECT MAX(seq) FROM Catalog_Changes) - ?
+        """,
+        (CHANGE_LOG_RETENTION,),
+    )
+
+
+def fetch_changes(since: int, limit: int) -> dict:
+    """Returns up to ``limit`` changes after ``since``.
+
+    ``last_seq`` is the ``since`` to ask with next. ``reset`` means changes
+    after ``since`` are no longer all retained: reload the full catalog and
+    follow the feed from its X-Catalog-Seq.
+    """
+    with db_pool.connection() as db:
+        oldest, newest = db.execute(
+            "SELECT COALESCE(MIN(seq), 0), COALESCE(MAX(seq), 0) FROM Catalog_Changes"
+        ).fetchone()
+        if since > newest or since < oldest - 1:
+            return {"changes": [], "last_seq": newest, "reset": True}
+        rows = db.execute(
+            """
+            SELECT seq, entity, entity_id, op, data FROM Catalog_Changes
+            WHERE seq > ?
+            ORDER BY seq
+            LIMIT ?
+            """,
+            (since, limit),
+        ).fetchall()
+    changes = [
+        {
+            "seq": row["seq"],
+            "entity": row["entity"],
+            "id": row["entity_id"],
+            "op": row["op"],
+            "data": json.loads(row["data"]) if row["data"] is not None else None,
+        }
+        for row in rows
+    ]
+    return {
+        "changes": changes,
+        "last_seq": changes[-1]["seq"] if changes else max(since, newest),
+        "reset": False,
+    }
+
+
+def search_quests(query: str, limit: int, offset: int) -> tuple:
+    """Returns (total matches, ids of one page) for an FTS5 query, best first."""
+    with db_pool.connection() as db:
+        (total,) = db.execute(
+            "SELECT COUNT(*) FROM Quests_Search WHERE Quests_Search MATCH ?",
+            (query,),
+        ).fetchone()
+        rows = db.execute(
+            """
+            SELECT rowid FROM Quests_Search
+            WHERE Quests_Search MATCH ?
+            ORDER BY bm25(Quests_Search, ?, 1.0), rowid
+            LIMIT ? OFFSET ?
+            """,
+            (query, SEARCH_NAME_WEIGHT, limit, offset),
+        ).fetchall()
+    return total, [row[0] for row in rows]
+
+
+rebuild_snapshot()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def parse_ids(ids: str) -> List[int]:
+    """Parses a comma-separated ?ids= value, dropping repeats but keeping order."""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=400, detail="ids must be comma-separated integers"
+        )
+    if len(parsed) > BATCH_LOOKUP_MAX:
+        raise HTTPException(
+            status_code=400, detail=f"At most {BATCH_LOOKUP_MAX} ids per request"
+        )
+    return list(dict.fromkeys(parsed))
+
+
+def expands_reward(expand: Optional[str]) -> bool:
+    if expand is None:
+        return False
+    if expand != "reward":
+        raise HTTPException(status_code=400, detail="expand supports only 'reward'")
+    return True
+
+
+def search_query(q: str) -> str:
+    """Turns search box text into an FTS5 query matching quests with every word.
+
+    The last word also matches as a prefix, so results follow typing. FTS5
+    operators and quotes in the text are treated as plain words.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        raise HTTPException(status_code=400, detail="q must contain a word")
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def snapshot_response(
+    snapshot: CatalogSnapshot, encoded: Encoded, if_none_match: Optional[str]
+) -> Response:
+    headers = {
+        "ETag": encoded.etag,
+        "X-Catalog-Version": str(snapshot.version),
+        # Where a consumer holding this response should start the change feed
+        "X-Catalog-Seq": str(snapshot.last_seq),
+    }
+    if etag_matches(if_none_match, encoded.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(encoded.body, media_type="application/json", headers=headers)
+
+
 # Reward Endpoints
 @app.post("/rewards/", response_model=Reward)
 def create_reward(reward: RewardCreate, db: sqlite3.Connection = Depends(get_db)):
@@ -116,26 +629,34 @@ def create_reward(reward: RewardCreate, db: sqlite3.Connection = Depends(get_db)
         (reward.reward_name, reward.reward_item, reward.reward_qty),
     )
     reward_id = cursor.lastrowid
+    record_change(cursor, "reward", reward_id)
     db.commit()
+    refresh_snapshot(db)
     return Reward(reward_id=reward_id, **reward.dict())
 
 
 @app.get("/rewards/", response_model=List[Reward])
-def get_rewards(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Rewards")
-    rewards = cursor.fetchall()
-    return [Reward(**dict(r)) for r in rewards]
+async def get_rewards(
+    ids: Optional[str] = None, if_none_match: Optional[str] = Header(None)
+):
+    """Lists every reward, or with ``ids=1,2,3`` just those that exist, in that order."""
+    snapshot = catalog_snapshot
+    if ids is None:
+        encoded = snapshot.reward_list
+    else:
+        encoded = encode_list(
+            [snapshot.rewards[i] for i in parse_ids(ids) if i in snapshot.rewards]
+        )
+    return snapshot_response(snapshot, encoded, if_none_match)
 
 
 @app.get("/rewards/{reward_id}/", response_model=Reward)
-def get_reward(reward_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Rewards WHERE reward_id = ?", (reward_id,))
-    reward = cursor.fetchone()
-    if not reward:
+async def get_reward(reward_id: int, if_none_match: Optional[str] = Header(None)):
+    snapshot = catalog_snapshot
+    encoded = snapshot.rewards.get(reward_id)
+    if encoded is None:
         raise HTTPException(status_code=404, detail="Reward not found")
-    return Reward(**dict(reward))
+    return snapshot_response(snapshot, encoded, if_none_match)
 
 
 @app.put("/rewards/{reward_id}/", response_model=Reward)
@@ -155,7 +676,9 @@ def update_reward(
         """,
         (reward.reward_name, reward.reward_item, reward.reward_qty, reward_id),
     )
+    record_change(cursor, "reward", reward_id)
     db.commit()
+    refresh_snapshot(db)
     cursor.execute("SELECT * FROM Rewards WHERE reward_id = ?", (reward_id,))
     updated_reward = cursor.fetchone()
     return Reward(**dict(updated_reward))
@@ -169,7 +692,9 @@ def delete_reward(reward_id: int, db: sqlite3.Connection = Depends(get_db)):
     if not reward:
         raise HTTPException(status_code=404, detail="Reward not found")
     cursor.execute("DELETE FROM Rewards WHERE reward_id = ?", (reward_id,))
+    record_change(cursor, "reward", reward_id)
     db.commit()
+    refresh_snapshot(db)
     return {"message": "Reward deleted successfully"}
 
 
@@ -182,10 +707,13 @@ def create_quest(quest: QuestCreate, db: sqlite3.Connection = Depends(get_db)):
     reward = cursor.fetchone()
     if not reward:
         raise HTTPException(status_code=404, detail="Associated reward not found")
+    quest.trigger = default_trigger(quest.name, quest.trigger)
+    validate_trigger(quest.trigger)
     cursor.execute(
         """
-        INSERT INTO Quests (reward_id, auto_claim, streak, duplication, name, description)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO Quests (reward_id, auto_claim, streak, duplication, name, description,
+                            trigger_event, trigger_predicates)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             quest.reward_id,
@@ -194,29 +722,83 @@ def create_quest(quest: QuestCreate, db: sqlite3.Connection = Depends(get_db)):
             quest.duplication,
             quest.name,
             quest.description,
+            *trigger_columns(quest.trigger),
         ),
     )
     quest_id = cursor.lastrowid
+    record_change(cursor, "quest", quest_id)
     db.commit()
+    refresh_snapshot(db)
     return Quest(quest_id=quest_id, **quest.dict())
 
 
-@app.get("/quests/", response_model=List[Quest])
-def get_quests(db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Quests")
-    quests = cursor.fetchall()
-    return [Quest(**dict(q)) for q in quests]
+@app.get("/quests/", response_model=List[QuestWithReward])
+async def get_quests(
+    ids: Optional[str] = None,
+    expand: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Lists every quest, or with ``ids=1,2,3`` just those that exist, in that order.
 
+    ``expand=reward`` embeds each quest's reward.
+    """
+    snapshot = catalog_snapshot
+    with_reward = expands_reward(expand)
+    if ids is None:
+        encoded = (
+            snapshot.quest_list_with_reward if with_reward else snapshot.quest_list
+        )
+    else:
+        quests = snapshot.quests_with_reward if with_reward else snapshot.quests
+        encoded = encode_list([quests[i] for i in parse_ids(ids) if i in quests])
+    return snapshot_response(snapshot, encoded, if_none_match)
 
-@app.get("/quests/{quest_id}/", response_model=Quest)
-def get_quest(quest_id: int, db: sqlite3.Connection = Depends(get_db)):
-    cursor = db.cursor()
-    cursor.execute("SELECT * FROM Quests WHERE quest_id = ?", (quest_id,))
-    quest = cursor.fetchone()
-    if not quest:
+
+# Both forms are registered here, ahead of /quests/{quest_id}/, which would
+# otherwise take "search/" as a quest id
+@app.get("/quests/search")
+@app.get("/quests/search/")
+async def search_quest_catalog(
+    q: str,
+    limit: int = SEARCH_PAGE_DEFAULT,
+    offset: int = 0,
+    expand: Optional[str] = None,
+):
+    """Full-text search over quest names and descriptions.
+
+    Returns ``{"total": ..., "quests": [...]}`` with the best matches first;
+    a match in the name outranks one in the description. Page through with
+    ``limit`` and ``offset``. ``expand=reward`` embeds each quest's reward.
+    """
+    with_reward = expands_reward(expand)
+    limit = max(1, min(limit, SEARCH_PAGE_MAX))
+    total, ids = await run_in_threadpool(
+        search_quests, search_query(q), limit, max(0, offset)
+    )
+    snapshot = catalog_snapshot
+    quests = snapshot.quests_with_reward if with_reward else snapshot.quests
+    # Quests the snapshot no longer (or does not yet) hold are left out
+    page = b",".join(quests[i].body for i in ids if i in quests)
+    return Response(
+        b'{"total":%d,"quests":[%s]}' % (total, page),
+        media_type="application/json",
+        headers={"X-Catalog-Version": str(snapshot.version)},
+    )
+
+
+@app.get("/quests/{quest_id}/", response_model=QuestWithReward)
+async def get_quest(
+    quest_id: int,
+    expand: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Returns one quest; ``expand=reward`` embeds its reward."""
+    snapshot = catalog_snapshot
+    quests = snapshot.quests_with_reward if expands_reward(expand) else snapshot.quests
+    encoded = quests.get(quest_id)
+    if encoded is None:
         raise HTTPException(status_code=404, detail="Quest not found")
-    return Quest(**dict(quest))
+    return snapshot_response(snapshot, encoded, if_none_match)
 
 
 @app.put("/quests/{quest_id}/", response_model=Quest)
@@ -230,6 +812,13 @@ def update_quest(
         raise HTTPException(status_code=404, detail="Quest not found")
 
     update_data = quest.dict(exclude_unset=True)
+    if "trigger" in update_data:
+        validate_trigger(quest.trigger)
+        del update_data["trigger"]
+        (
+            update_data["trigger_event"],
+            update_data["trigger_predicates"],
+        ) = trigger_columns(quest.trigger)
 
     if "reward_id" in update_data:
         cursor.execute(
@@ -251,10 +840,12 @@ def update_quest(
         """,
         values,
     )
+    record_change(cursor, "quest", quest_id)
     db.commit()
+    refresh_snapshot(db)
     cursor.execute("SELECT * FROM Quests WHERE quest_id = ?", (quest_id,))
     updated_quest = cursor.fetchone()
-    return Quest(**dict(updated_quest))
+    return quest_from_row(updated_quest)
 
 
 @app.delete("/quests/{quest_id}/")
@@ -265,10 +856,387 @@ def delete_quest(quest_id: int, db: sqlite3.Connection = Depends(get_db)):
     if not quest:
         raise HTTPException(status_code=404, detail="Quest not found")
     cursor.execute("DELETE FROM Quests WHERE quest_id = ?", (quest_id,))
+    record_change(cursor, "quest", quest_id)
     db.commit()
+    refresh_snapshot(db)
     return {"message": "Quest deleted successfully"}
 
 
+# Bulk Import
+async def read_import_rows(request: Request) -> tuple:
+    """Reads an import body into (row, item) pairs and row errors.
+
+    NDJSON bodies are parsed line by line as they stream in, rows numbered
+    by line; anything else must be a JSON array, rows numbered by position.
+    Both count from 1.
+    """
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    rows, errors = [], []
+
+    def add(row: int, item):
+        if len(rows) >= IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=413, detail=f"At most {IMPORT_MAX_ROWS} rows per import"
+            )
+        rows.append((row, item))
+
+    if media_type in NDJSON_MEDIA_TYPES:
+
+        def add_line(row: int, line: bytes):
+            if not line.strip():
+                return
+            try:
+                add(row, json.loads(line))
+            except ValueError as e:
+                errors.append({"row": row, "error": f"Invalid JSON: {e}"})
+
+        line_numbers = itertools.count(1)
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                add_line(next(line_numbers), line)
+        add_line(next(line_numbers), pending)
+        return rows, errors
+
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        items = None
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=400, detail="Body must be a JSON array, or NDJSON"
+        )
+    for row, item in enumerate(items, 1):
+        add(row, item)
+    return rows, errors
+
+
+def parse_import_row(item) -> BaseModel:
+    if not isinstance(item, dict):
+        raise ValueError("Row must be a JSON object")
+    fields = dict(item)
+    model = IMPORT_MODELS.get(fields.pop("type", None))
+    if model is None:
+        raise ValueError("type must be 'reward' or 'quest'")
+    try:
+        parsed = model(**fields)
+    except ValidationError as e:
+        raise ValueError(
+            "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+                for error in e.errors()
+            )
+        )
+    if model is QuestImport:
+        parsed.trigger = default_trigger(parsed.name, parsed.trigger)
+        if (parsed.reward_id is None) == (parsed.reward_ref is None):
+            raise ValueError("Set exactly one of reward_id and reward_ref")
+        try:
+            validate_trigger(parsed.trigger)
+        except HTTPException as e:
+            raise ValueError(e.detail)
+    return parsed
+
+
+def duplicate_errors(parsed: List[tuple], field: str, label: str) -> List[dict]:
+    """Flags each (row, model) whose ``field`` repeats an earlier row's."""
+    first_rows, errors = {}, []
+    for row, model in parsed:
+        value = getattr(model, field)
+        if value is None:
+            continue
+        if value in first_rows:
+            errors.append(
+                {
+                    "row": row,
+                    "error": f"Duplicate {label} {value!r} (first on row {first_rows[value]})",
+                }
+            )
+        else:
+            first_rows[value] = row
+    return errors
+
+
+def validate_import(rows: List[tuple]) -> tuple:
+    """Parses import rows and checks them against each other.
+
+    Returns (rewards, quests, errors), the first two as (row, model) lists.
+    References to rows already in the catalog are checked by apply_import,
+    under its write lock.
+    """
+    rewards, quests, errors = [], [], []
+    for row, item in rows:
+        try:
+            parsed = parse_import_row(item)
+        except ValueError as e:
+            errors.append({"row": row, "error": str(e)})
+            continue
+        (rewards if isinstance(parsed, RewardImport) else quests).append((row, parsed))
+
+    errors += duplicate_errors(rewards, "ref", "reward ref")
+    errors += duplicate_errors(rewards, "reward_id", "reward_id")
+    errors += duplicate_errors(quests, "quest_id", "quest_id")
+    reward_refs = {reward.ref for _, reward in rewards}
+    errors += [
+        {"row": row, "error": f"No reward with ref {quest.reward_ref!r}"}
+        for row, quest in quests
+        if quest.reward_ref is not None and quest.reward_ref not in reward_refs
+    ]
+    errors.sort(key=lambda error: error["row"])
+    return rewards, quests, errors
+
+
+def existing_ids(db: sqlite3.Connection, table: str, key: str, ids) -> set:
+    """Returns which of ``ids`` are in ``table``, in one query."""
+    rows = db.execute(
+        f"SELECT {key} FROM {table} WHERE {key} IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(ids)),),
+    )
+    return {row[0] for row in rows}
+
+
+def allocate_ids(
+    db: sqlite3.Connection, table: str, key: str, taken: set
+) -> Iterator[int]:
+    """Yields the ids AUTOINCREMENT would hand out next, skipping ``taken``.
+
+    Only valid while holding the write lock.
+    """
+    (last,) = db.execute(
+        f"""
+        SELECT MAX(
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0),
+            COALESCE((SELECT MAX({key}) FROM {table}), 0)
+        )
+        """,
+        (table,),
+    ).fetchone()
+    return (i for i in itertools.count(last + 1) if i not in taken)
+
+
+def apply_import(rewards: List[tuple], quests: List[tuple]) -> dict:
+    """Upserts validated import rows in one transaction.
+
+    New rows are given their ids up front so quests can point at rewards
+    created alongside them, and every table is written with one
+    executemany.
+    """
+    with db_pool.connection() as db:
+        db.execute("BEGIN IMMEDIATE")
+        reward_ids = {reward.reward_id for _, reward in rewards} - {None}
+        referenced = {quest.reward_id for _, quest in quests} - {None}
+        known_rewards = existing_ids(
+            db, "Rewards", "reward_id", reward_ids | referenced
+        )
+        errors = [
+            {"row": row, "error": f"Reward {quest.reward_id} not found"}
+            for row, quest in quests
+            if quest.reward_id is not None
+            and quest.reward_id not in known_rewards | reward_ids
+        ]
+        if errors:
+            # The pool rolls back the open transaction
+            raise HTTPException(status_code=400, detail=errors)
+        quest_ids = {quest.quest_id for _, quest in quests} - {None}
+        known_quests = existing_ids(db, "Quests", "quest_id", quest_ids)
+
+        new_reward_ids = allocate_ids(db, "Rewards", "reward_id", reward_ids)
+        reward_rows, ids_by_ref, results = [], {}, {"rewards": [], "quests": []}
+        for row, reward in rewards:
+            reward_id = reward.reward_id
+            if reward_id is None:
+                reward_id = next(new_reward_ids)
+            if reward.ref is not None:
+                ids_by_ref[reward.ref] = reward_id
+            reward_rows.append(
+                {
+                    "reward_id": reward_id,
+                    "reward_name": reward.reward_name,
+                    "reward_item": reward.reward_item,
+                    "reward_qty": reward.reward_qty,
+                }
+            )
+            results["rewards"].append(
+                {
+                    "row": row,
+                    "ref": reward.ref,
+                    "reward_id": reward_id,
+                    "created": reward_id not in known_rewards,
+                }
+            )
+
+        new_quest_ids = allocate_ids(db, "Quests", "quest_id", quest_ids)
+        quest_rows = []
+        for row, quest in quests:
+            quest_id = quest.quest_id
+            if quest_id is None:
+                quest_id = next(new_quest_ids)
+            trigger_event, trigger_predicates = trigger_columns(quest.trigger)
+            quest_rows.append(
+                {
+                    "quest_id": quest_id,
+                    "reward_id": (
+                        quest.reward_id
+                        if quest.reward_ref is None
+                        else ids_by_ref[quest.reward_ref]
+                    ),
+                    "auto_claim": quest.auto_claim,
+                    "streak": quest.streak,
+                    "duplication": quest.duplication,
+                    "name": quest.name,
+                    "description": quest.description,
+                    "trigger_event": trigger_event,
+                    "trigger_predicates": trigger_predicates,
+                }
+            )
+            results["quests"].append(
+                {
+                    "row": row,
+                    "ref": quest.ref,
+                    "quest_id": quest_id,
+                    "created": quest_id not in known_quests,
+                }
+            )
+
+        db.executemany(
+            """
+            INSERT INTO Rewards (reward_id, reward_name, reward_item, reward_qty)
+            VALUES (:reward_id, :reward_name, :reward_item, :reward_qty)
+            ON CONFLICT (reward_id) DO UPDATE SET
+                reward_name = excluded.reward_name,
+                reward_item = excluded.reward_item,
+                reward_qty = excluded.reward_qty
+            """,
+            reward_rows,
+        )
+        db.executemany(
+            """
+            INSERT INTO Quests (quest_id, reward_id, auto_claim, streak, duplication,
+                                name, description, trigger_event, trigger_predicates)
+            VALUES (:quest_id, :reward_id, :auto_claim, :streak, :duplication,
+                    :name, :description, :trigger_event, :trigger_predicates)
+            ON CONFLICT (quest_id) DO UPDATE SET
+                reward_id = excluded.reward_id,
+                auto_claim = excluded.auto_claim,
+                streak = excluded.streak,
+                duplication = excluded.duplication,
+                name = excluded.name,
+                description = excluded.description,
+                trigger_event = excluded.trigger_event,
+                trigger_predicates = excluded.trigger_predicates
+            """,
+            quest_rows,
+        )
+        cursor = db.cursor()
+        record_changes(cursor, "reward", reward_rows)
+        record_changes(cursor, "quest", quest_rows)
+        db.commit()
+        refresh_snapshot(db)
+    return results
+
+
+@app.post("/catalog/import")
+async def import_catalog(request: Request):
+    """Creates or updates many rewards and quests in one transaction.
+
+    The body is a JSON array or NDJSON (Content-Type application/x-ndjson)
+    of rows like ``{"type": "reward", "ref": "gold", "reward_name": ...}`` and
+    ``{"type": "quest", "reward_ref": "gold", "name": ...}``. A row with a
+    ``reward_id`` or ``quest_id`` replaces that entity, or creates it with
+    that id; one without gets a new id. Quests point at a reward by
+    ``reward_id`` or, for one in the same import, ``reward_ref``.
+
+    Every row is checked before anything is written: if any fails, nothing
+    is imported and the 400 response lists each failing row. Otherwise the
+    response gives each row's id and whether it was created.
+    """
+    rows, errors = await read_import_rows(request)
+    rewards, quests, row_errors = validate_import(rows)
+    errors = sorted(errors + row_errors, key=lambda error: error["row"])
+    if errors:
+        raise HTTPException(status_code=400, detail=errors)
+    if not rows:
+        return {"rewards": [], "quests": []}
+    return await run_in_threadpool(apply_import, rewards, quests)
+
+
+# Change Feed Endpoints
+@app.get("/changes")
+async def get_changes(
+    since: int = 0, timeout: float = CHANGES_POLL_TIMEOUT, limit: int = CHANGES_PAGE_MAX
+):
+    """Returns catalog changes after sequence number ``since``.
+
+    When there are none yet, waits up to ``timeout`` seconds for one
+    (long-poll). Each change carries the entity's full new state, or op
+    "delete". Ask again with the returned ``last_seq``.
+    """
+    timeout = max(0.0, min(timeout, CHANGES_POLL_MAX))
+    limit = max(1, min(limit, CHANGES_PAGE_MAX))
+    # Taken before the check, so a write landing in between still wakes us
+    event = changes_event
+    if since == catalog_snapshot.last_seq and timeout > 0:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(event.wait(), timeout)
+    return await run_in_threadpool(fetch_changes, since, limit)
+
+
+@app.get("/changes/stream")
+async def stream_changes(
+    since: Optional[int] = None, last_event_id: Optional[str] = Header(None)
+):
+    """Streams catalog changes after ``since`` as server-sent events.
+
+    Each change is a "change" event whose id is its sequence number, so a
+    reconnecting client resumes from Last-Event-ID. A "reset" event means
+    changes were missed: reload the full catalog.
+    """
+    if last_event_id is not None:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    async def events():
+        cursor = catalog_snapshot.last_seq if since is None else since
+        while True:
+            event = changes_event
+            batch = await run_in_threadpool(fetch_changes, cursor, CHANGES_PAGE_MAX)
+            if batch["reset"]:
+                yield f"event: reset\ndata: {json.dumps(batch)}\n\n"
+            for change in batch["changes"]:
+                yield f"id: {change['seq']}\nevent: change\ndata: {json.dumps(change)}\n\n"
+            cursor = batch["last_seq"]
+            if len(batch["changes"]) < CHANGES_PAGE_MAX:
+                try:
+                    await asyncio.wait_for(event.wait(), CHANGES_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Keeps idle connections from being dropped by proxies
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@app.get("/metrics/db")
+def get_db_metrics():
+    return db_pool.stats()
+
+
+@app.get("/metrics/snapshot")
+async def get_snapshot_metrics():
+    snapshot = catalog_snapshot
+    return {
+        "version": snapshot.version,
+        "last_seq": snapshot.last_seq,
+        "quests": len(snapshot.quests),
+        "rewards": len(snapshot.rewards),
+        "bytes": len(snapshot.quest_list.body) + len(snapshot.reward_list.body),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,13 +1,61 @@
 # quest_processing_service.py
 
+import asyncio
+import base64
+import bisect
+import datetime
+import hashlib
+import json
+import operator
 import sqlite3
-from fastapi import FastAPI, Depends, HTTPException
+import time
+import uuid
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List
-import requests
+from typing import Any, Dict, List, Optional
+import httpx
 
-app = FastAPI()
+from database import ConnectionPool, connect
+from sharding import ShardSet
+
+# Assignment jobs; per-user tables live in ``shards``
+db_pool = ConnectionPool("quest_processing.db")
+
+# Shared pooled client for calls to the catalog and auth services
+http_client = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS,
+        ),
+        # Calls beyond the connection limit queue for a free connection instead
+        # of failing; connect and read still time out
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, pool=None),
+    )
+    await catalog_cache.start()
+    await reward_grant_dispatcher.start()
+    await assignment_jobs.start()
+    await quest_archiver.start()
+    try:
+        yield
+    finally:
+        await quest_archiver.stop()
+        await assignment_jobs.stop()
+        await reward_grant_dispatcher.stop()
+        await catalog_cache.stop()
+        await http_client.aclose()
+        shards.close()
+        db_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS (Adjust origins as needed)
 app.add_middleware(
@@ -16,24 +64,109 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Service URLs (Consider moving to environment variables for flexibility)
-AUTH_SERVICE_ADD_DIAMONDS_URL = "http://localhost:8001/add-diamonds/{user_id}/"
+AUTH_SERVICE_CREDIT_BATCH_URL = "http://localhost:8001/credit-batch/"
 QUEST_CATALOG_SERVICE_URL = "http://localhost:8002"
+AUTH_SERVICE_USER_IDS_URL = "http://localhost:8001/user-ids/"
 
-def get_db():
-    """Provides a connection to the Quest Processing Service's database."""
-    conn = sqlite3.connect("quest_processing.db", check_same_thread=False)
-    conn.row_factory = sqlite3.Row  # Enables name-based access to columns
-    try:
-        yield conn
-    finally:
-        conn.close()
+# Maximum number of ids bound into a single "IN (...)" clause
+SQL_IN_CHUNK_SIZE = 500
 
-def init_db():
-    """Initializes the Quest Processing Service's database."""
-    conn = sqlite3.connect("quest_processing.db")
+# GET /user-quests paging
+USER_QUESTS_PAGE_SIZE = 100
+USER_QUESTS_PAGE_MAX = 1000
+USER_QUEST_FIELDS = ("user_id", "quest_id", "status", "date")
+
+# Largest batch POST /events accepts
+EVENT_BATCH_MAX_SIZE = 1000
+
+# Operators a quest trigger predicate may use, applied as op(event_value, operand)
+PREDICATE_OPERATORS = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "in": lambda value, operand: value in operand,
+}
+
+# Bulk quest assignment jobs
+ASSIGN_JOB_CHUNK_SIZE = 1000  # users assigned per transaction
+
+# Outgoing HTTP settings for http_client
+UPSTREAM_MAX_CONNECTIONS = 20
+UPSTREAM_TIMEOUT = 5.0
+
+# Reward-grant outbox delivery to the Auth Service
+GRANT_OUTBOX_BATCH_SIZE = 100
+GRANT_OUTBOX_POLL_INTERVAL = 1.0  # seconds between polls when the outbox is idle
+GRANT_OUTBOX_RETRY_BASE = 1.0  # first retry delay in seconds, doubled per attempt
+GRANT_OUTBOX_RETRY_MAX = 300.0
+
+# Claimed quests move to User_Quest_Rewards_Archive once claimed this long ago
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_SCAN_SIZE = 2000  # User_Quest_Rewards rowids examined per archive transaction
+ARCHIVE_BATCH_PAUSE = 0.05  # seconds between transactions, so other writers get the lock
+ARCHIVE_INTERVAL = 3600.0  # seconds between passes over every shard
+# Stored claim/complete results answer retries this long, then the archive
+# pass deletes them
+TRANSITION_RESULT_TTL_HOURS = 24
+TRANSITION_RESULT_PRUNE_BATCH = 2000  # rows deleted per transaction
+
+# Local copy of the quest catalog, refreshed in the background
+CATALOG_REFRESH_INTERVAL = 30.0  # seconds between revalidations
+CATALOG_RETRY_INTERVAL = 5.0  # seconds between attempts while the catalog is unreachable
+CATALOG_CHANGES_TIMEOUT = 30.0  # seconds each change-feed long-poll waits for a change
+
+# Per-user tables are split by user_id hash across this many database files,
+# each with its own write lock. Change it only together with
+# reshard_quest_processing.py, which moves the rows.
+PROCESSING_SHARD_COUNT = 1
+SHARDED_TABLES = (
+    "User_Quest_Rewards",
+    "Quest_Progress",
+    "Reward_Grant_Outbox",
+    "Quest_Transition_Results",
+    "User_Quest_Rewards_Archive",
+)
+
+def shard_paths(count: int) -> list:
+    """Database files of a ``count``-shard layout; a single shard is the original file."""
+    if count == 1:
+        return ["quest_processing.db"]
+    return [f"quest_processing.{count}-{index}.db" for index in range(count)]
+
+async def run_db(fn, *args):
+    """
+    Runs ``fn(db, *args)`` with a pooled connection in a worker thread, so
+    SQLite calls never block the event loop.
+    """
+    def call():
+        with db_pool.connection() as db:
+            return fn(db, *args)
+    return await run_in_threadpool(call)
+
+async def run_on_shard(index: int, fn, *args):
+    """Like run_db, on shard ``index``."""
+    def call():
+        with shards.pools[index].connection() as db:
+            return fn(db, *args)
+    return await run_in_threadpool(call)
+
+async def run_shard(user_id: int, fn, *args):
+    """Like run_db, on the shard holding ``user_id``'s rows."""
+    return await run_on_shard(shards.index_for(user_id), fn, *args)
+
+async def run_all_shards(fn, *args) -> list:
+    """Runs ``fn(db, *args)`` on every shard concurrently; results are in shard order."""
+    return await asyncio.gather(*(run_on_shard(index, fn, *args) for index in range(len(shards))))
+
+def init_shard_db(conn: sqlite3.Connection):
+    """Creates the per-user tables in one shard's database."""
     cursor = conn.cursor()
     cursor.execute(
         """
@@ -42,28 +175,189 @@ def init_db():
             quest_id INTEGER,
             status TEXT NOT NULL, -- "in_progress", "completed", "claimed"
             date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            claimed_at TIMESTAMP, -- set when the status becomes "claimed"
             FOREIGN KEY (user_id) REFERENCES Users(user_id),
             FOREIGN KEY (quest_id) REFERENCES Quests(quest_id),
             PRIMARY KEY (user_id, quest_id)
         );
         """
     )
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(User_Quest_Rewards)")}
+    if "claimed_at" not in columns:
+        cursor.execute("ALTER TABLE User_Quest_Rewards ADD COLUMN claimed_at TIMESTAMP")
+        # When older quests were claimed is unknown; they age from now
+        cursor.execute("UPDATE User_Quest_Rewards SET claimed_at = CURRENT_TIMESTAMP WHERE status = 'claimed'")
+    # Covering indexes for GET /user-quests, newest first, with and without
+    # a status filter; quest_id breaks ties between rows with the same date
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_quest_rewards_status
+        ON User_Quest_Rewards (user_id, status, date, quest_id)
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_quest_rewards_date
+        ON User_Quest_Rewards (user_id, date, quest_id, status)
+        """
+    )
+    # Per-user progress on each quest, updated in place once per event.
+    # Days are UTC calendar days in ISO format.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Quest_Progress (
+            user_id INTEGER NOT NULL,
+            quest_id INTEGER NOT NULL,
+            progress INTEGER NOT NULL DEFAULT 0, -- matching events seen
+            current_streak INTEGER NOT NULL DEFAULT 0, -- consecutive days with an event
+            last_event_day TEXT,
+            PRIMARY KEY (user_id, quest_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Reward_Grant_Outbox (
+            grant_id TEXT PRIMARY KEY, -- idempotency key for the Auth Service
+            user_id INTEGER NOT NULL,
+            quest_id INTEGER NOT NULL,
+            gold INTEGER NOT NULL DEFAULT 0,
+            diamond INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0 -- unix time
+        );
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_reward_grant_outbox_due
+        ON Reward_Grant_Outbox (next_attempt_at)
+        """
+    )
+    # Claimed quests moved out of User_Quest_Rewards and Quest_Progress by
+    # the archiver. A quest here stays claimed: it is never re-assigned.
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS User_Quest_Rewards_Archive (
+            user_id INTEGER NOT NULL,
+            quest_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            date TIMESTAMP,
+            claimed_at TIMESTAMP,
+            progress INTEGER,
+            current_streak INTEGER,
+            last_event_day TEXT,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, quest_id)
+        ) WITHOUT ROWID;
+        """
+    )
+    columns = {row["name"] for row in cursor.execute("PRAGMA table_info(User_Quest_Rewards_Archive)")}
+    if "claimed_at" not in columns:
+        cursor.execute("ALTER TABLE User_Quest_Rewards_Archive ADD COLUMN claimed_at TIMESTAMP")
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_user_quest_rewards_archive_date
+        ON User_Quest_Rewards_Archive (user_id, date, quest_id, status)
+        """
+    )
+    # Outcome of each claim or completion sent with an idempotency key,
+    # returned as-is when the request is retried
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Quest_Transition_Results (
+            user_id INTEGER NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            action TEXT NOT NULL, -- "claim" or "complete"
+            quest_id INTEGER NOT NULL,
+            status_code INTEGER NOT NULL,
+            body TEXT NOT NULL, -- JSON response
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, idempotency_key)
+        ) WITHOUT ROWID;
+        """
+    )
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_quest_transition_results_created
+        ON Quest_Transition_Results (created_at)
+        """
+    )
+    conn.commit()
+
+def init_db():
+    """Initializes the Quest Processing Service's database and its shards."""
+    conn = connect("quest_processing.db")
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Assignment_Jobs (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            quest_id INTEGER NOT NULL,
+            cohort TEXT NOT NULL, -- JSON, as posted
+            status TEXT NOT NULL, -- "running", "completed", "cancelled", "failed"
+            total INTEGER, -- NULL when the cohort size is not known up front
+            processed INTEGER NOT NULL DEFAULT 0,
+            assigned INTEGER NOT NULL DEFAULT 0,
+            last_user_id INTEGER, -- highest user id handled; jobs resume after it
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """
+    )
     conn.commit()
     conn.close()
+    for path in shard_paths(PROCESSING_SHARD_COUNT):
+        conn = connect(path)
+        init_shard_db(conn)
+        conn.close()
 
 # Initialize the database upon service start
 init_db()
 
+shards = ShardSet(shard_paths(PROCESSING_SHARD_COUNT))
+
 # Pydantic Models
 class AssignQuest(BaseModel):
     user_id: int
     quest_id: int
 
-class UserQuestReward(BaseModel):
+class QuestProgress(BaseModel):
     user_id: int
     quest_id: int
     status: str
-    date: str  # ISO format
+    progress: int
+    current_streak: int
+    streak_required: Optional[int]
+    last_event_day: Optional[str]
+
+class UserIdRange(BaseModel):
+    start: int
+    end: int  # inclusive
+
+class Cohort(BaseModel):
+    """Exactly one of these selects the users."""
+    user_ids: Optional[List[int]] = None
+    user_id_range: Optional[UserIdRange] = None
+    user_status: Optional[str] = None  # status name known to the Auth Service, e.g. "new"
+
+class BulkAssignQuest(BaseModel):
+    quest_id: int
+    cohort: Cohort
+
+class AssignmentJob(BaseModel):
+    job_id: int
+    quest_id: int
+    status: str
+    total: Optional[int]
+    processed: int
+    assigned: int
+    last_user_id: Optional[int]
+    error: Optional[str]
+    created_at: str
+    updated_at: str
 
 class TrackSignIn(BaseModel):
     user_id: int
@@ -71,66 +365,789 @@ class TrackSignIn(BaseModel):
 class ClaimQuest(BaseModel):
     user_id: int
     quest_id: int
+    idempotency_key: Optional[str] = None  # retries with the same key get the first response
+
+class CompleteQuest(ClaimQuest):
+    pass
+
+class Event(BaseModel):
+    user_id: int
+    type: str
+    attributes: Dict[str, Any] = {}
+    occurred_at: Optional[datetime.datetime] = None  # defaults to now; naive means UTC
+
+class EventBatch(BaseModel):
+    events: List[Event]
 
 # Helper Functions
-def get_quest_details(quest_id: int):
-    """Fetches quest details from the Quest Catalog Service."""
-    try:
-        response = requests.get(f"{QUEST_CATALOG_SERVICE_URL}/quests/{quest_id}/")
-        if response.status_code == 200:
-            return response.json()
-        else:
+def compile_predicates(predicates: dict):
+    """
+    Turns a trigger's predicates into a function of an event's attributes.
+
+    Each predicate maps an attribute either to a value it must equal or to
+    ``{operator: operand}`` conditions that must all hold.
+    """
+    checks = []
+    for attribute, condition in predicates.items():
+        if not isinstance(condition, dict):
+            condition = {"eq": condition}
+        for name, operand in condition.items():
+            checks.append((attribute, PREDICATE_OPERATORS[name], operand))
+
+    def matches(attributes: dict) -> bool:
+        for attribute, op, operand in checks:
+            if attribute not in attributes:
+                return False
+            try:
+                if not op(attributes[attribute], operand):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    return matches
+
+def build_trigger_index(quests: list) -> dict:
+    """Maps each event type to the ``(quest, matches)`` pairs it can advance."""
+    index = {}
+    for quest in quests:
+        trigger = quest.get("trigger")
+        if not trigger:
+            continue
+        try:
+            matches = compile_predicates(trigger.get("predicates") or {})
+        except (KeyError, AttributeError) as e:
+            print(f"Skipping quest {quest['quest_id']} with an invalid trigger: {e}")
+            continue
+        index.setdefault(trigger["event_type"], []).append((quest, matches))
+    return index
+
+class CatalogCache:
+    """
+    In-process copy of the Quest Catalog Service's quests and rewards, indexed by id.
+
+    After loading both lists, a background task follows the catalog's change
+    feed and applies each change as it happens. If the feed is unavailable it
+    falls back to revalidating both lists with If-None-Match, and only
+    rebuilds the indexes when the content changed. While the catalog is
+    unreachable the last good copy keeps being served (stale-while-revalidate),
+    so request handlers never wait on the catalog.
+    """
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self.quests = {}
+        self.triggers = {}  # event type -> [(quest, predicate matcher)]
+        self.rewards = {}
+        self.version = 0  # bumped whenever either index changes
+        self.last_refresh = None  # time.time() of the last successful revalidation
+        self.last_error = None
+        self.seq = None  # change-feed position; None while polling
+        self._etags = {}
+        self._digests = {}
+        self._seqs = {}
+        self._wake = None
+        self._task = None
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        # Warm the cache before serving; failures are retried in the background
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    def request_refresh(self):
+        """Asks the background task to revalidate now, e.g. after a cache miss."""
+        if self._wake is not None:
+            self._wake.set()
+
+    @property
+    def stale(self) -> bool:
+        return self.last_error is not None
+
+    async def _run(self):
+        while True:
+            if self.seq is not None and not self.stale and await self.follow_changes():
+                continue
+            interval = CATALOG_RETRY_INTERVAL if self.stale else CATALOG_REFRESH_INTERVAL
+            with suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), interval)
+            self._wake.clear()
+            await self.refresh()
+
+    async def _fetch(self, path: str):
+        """Returns the decoded list at ``path``, or None when it is unchanged."""
+        headers = {}
+        if path in self._etags:
+            headers["If-None-Match"] = self._etags[path]
+        response = await http_client.get(f"{self.base_url}{path}", headers=headers)
+        self._seqs[path] = response.headers.get("x-catalog-seq")
+        if response.status_code == 304:
             return None
-    except requests.exceptions.RequestException:
-        return None
+        response.raise_for_status()
+        if "etag" in response.headers:
+            self._etags[path] = response.headers["etag"]
+        # The catalog may not send ETags, so compare content as well
+        digest = hashlib.sha256(response.content).hexdigest()
+        if self._digests.get(path) == digest:
+            return None
+        self._digests[path] = digest
+        return response.json()
 
-def get_all_quests():
-    """Fetches all quests from the Quest Catalog Service."""
-    try:
-        response = requests.get(f"{QUEST_CATALOG_SERVICE_URL}/quests/")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return []
-    except requests.exceptions.RequestException:
-        return []
+    async def refresh(self) -> bool:
+        try:
+            quests, rewards = await asyncio.gather(
+                self._fetch("/quests/"), self._fetch("/rewards/")
+            )
+        except (httpx.HTTPError, ValueError) as e:
+            self.last_error = str(e)
+            print(f"Catalog refresh failed, serving version {self.version}: {e}")
+            return False
+        # Swap in whole new dicts so readers never see a half-built index
+        if quests is not None:
+            self.quests = {quest["quest_id"]: quest for quest in quests}
+            self.triggers = build_trigger_index(quests)
+        if rewards is not None:
+            self.rewards = {reward["reward_id"]: reward for reward in rewards}
+        if quests is not None or rewards is not None:
+            self.version += 1
+        # Follow the feed from the older of the two lists; replaying a change
+        # already held is harmless
+        seqs = [self._seqs.get(path) for path in ("/quests/", "/rewards/")]
+        self.seq = min(int(seq) for seq in seqs) if None not in seqs else None
+        self.last_refresh = time.time()
+        self.last_error = None
+        return True
+
+    async def follow_changes(self) -> bool:
+        """
+        Long-polls the change feed once and applies what it returns. Returns
+        False if the feed failed, so the caller falls back to polling.
+        """
+        try:
+            response = await http_client.get(
+                f"{self.base_url}/changes",
+                params={"since": self.seq, "timeout": CATALOG_CHANGES_TIMEOUT},
+                timeout=CATALOG_CHANGES_TIMEOUT + UPSTREAM_TIMEOUT,
+            )
+            response.raise_for_status()
+            feed = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Catalog change feed failed, polling instead: {e}")
+            # The next successful refresh picks the feed up again
+            self.seq = None
+            return False
+        if feed["reset"]:
+            # Changes were missed; reload everything and follow from there
+            await self.refresh()
+            return True
+        if feed["changes"]:
+            self.apply_changes(feed["changes"])
+        self.seq = feed["last_seq"]
+        self.last_refresh = time.time()
+        return True
+
+    def apply_changes(self, changes: list):
+        quests = dict(self.quests)
+        rewards = dict(self.rewards)
+        for change in changes:
+            index = quests if change["entity"] == "quest" else rewards
+            if change["op"] == "delete":
+                index.pop(change["id"], None)
+            else:
+                index[change["id"]] = change["data"]
+        # Swap in whole new dicts so readers never see a half-built index
+        if any(change["entity"] == "quest" for change in changes):
+            self.quests = quests
+            self.triggers = build_trigger_index(list(quests.values()))
+        self.rewards = rewards
+        self.version += 1
+        # The stored ETags and digests describe the lists before these changes
+        self._etags.clear()
+        self._digests.clear()
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "quests": len(self.quests),
+            "rewards": len(self.rewards),
+            "event_types": len(self.triggers),
+            "seq": self.seq,
+            "age": time.time() - self.last_refresh if self.last_refresh else None,
+            "stale": self.stale,
+            "last_error": self.last_error,
+        }
+
+catalog_cache = CatalogCache(QUEST_CATALOG_SERVICE_URL)
+
+def get_quest_details(quest_id: int):
+    """Looks up quest details in the local catalog cache."""
+    quest = catalog_cache.quests.get(quest_id)
+    if quest is None:
+        # It may have been created since the last refresh
+        catalog_cache.request_refresh()
+    return quest
+
+def match_event_quests(event: Event) -> list:
+    """Returns the quests an event advances, using the catalog's trigger index."""
+    return [
+        quest
+        for quest, matches in catalog_cache.triggers.get(event.type, ())
+        if matches(event.attributes)
+    ]
 
 def get_reward_details(reward_id: int):
-    """Fetches reward details from the Quest Catalog Service."""
-    try:
-        response = requests.get(f"{QUEST_CATALOG_SERVICE_URL}/rewards/{reward_id}/")
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return None
-    except requests.exceptions.RequestException:
+    """Looks up reward details in the local catalog cache."""
+    reward = catalog_cache.rewards.get(reward_id)
+    if reward is None:
+        catalog_cache.request_refresh()
+    return reward
+
+def reward_grant_row(user_id: int, quest_id: int, reward: dict):
+    """
+    Builds the Reward_Grant_Outbox row crediting ``reward`` to the user, or
+    returns None if the reward cannot be granted.
+    """
+    if reward is None:
+        return None
+    gold = diamond = 0
+    if reward["reward_item"] == "gold":
+        gold = reward["reward_qty"]
+    elif reward["reward_item"] == "diamond":
+        diamond = reward["reward_qty"]
+    else:
+        print(f"Unknown reward item '{reward['reward_item']}' for user {user_id}.")
         return None
+    return (uuid.uuid4().hex, user_id, quest_id, gold, diamond)
 
-def reward_user(user_id: int, qty: int, item: str):
-    """Grants rewards to the user via the Auth Service."""
-    try:
-        if item == "diamond":
-            url = AUTH_SERVICE_ADD_DIAMONDS_URL.format(user_id=user_id)
-            payload = {"diamonds": qty}
-        elif item == "gold":
-            # Assuming there's a separate endpoint for adding gold
-            # Replace with the actual URL if different
-            AUTH_SERVICE_ADD_GOLD_URL = "http://localhost:8001/add-gold/{user_id}/"
-            url = AUTH_SERVICE_ADD_GOLD_URL.format(user_id=user_id)
-            payload = {"gold": qty}
-        else:
-            print(f"Unknown reward item '{item}' for user {user_id}.")
-            return
-        response = requests.post(url, json=payload)
-        if response.status_code != 200:
-            print(f"Failed to add {item} to user {user_id}: {response.text}")
-    except Exception as e:
-        print(f"Failed to reward user {user_id}: {e}")
+def insert_reward_grants(cursor: sqlite3.Cursor, grants: list):
+    """Queues grants in the caller's transaction; commit it, then notify the dispatcher."""
+    cursor.executemany(
+        """
+        INSERT INTO Reward_Grant_Outbox (grant_id, user_id, quest_id, gold, diamond)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        grants
+    )
+
+def fetch_due_grants(db: sqlite3.Connection, limit: int):
+    cursor = db.cursor()
+    cursor.execute(
+        """
+        SELECT grant_id, user_id, gold, diamond, attempts FROM Reward_Grant_Outbox
+        WHERE next_attempt_at <= ?
+        ORDER BY rowid
+        LIMIT ?
+        """,
+        (time.time(), limit)
+    )
+    return cursor.fetchall()
+
+def finish_grants(db: sqlite3.Connection, done: list, retries: list):
+    cursor = db.cursor()
+    cursor.executemany("DELETE FROM Reward_Grant_Outbox WHERE grant_id = ?", done)
+    cursor.executemany(
+        """
+        UPDATE Reward_Grant_Outbox
+        SET attempts = attempts + 1, next_attempt_at = ?
+        WHERE grant_id = ?
+        """,
+        retries
+    )
+    db.commit()
+
+class RewardGrantDispatcher:
+    """
+    Background task that drains Reward_Grant_Outbox to the Auth Service.
+
+    Each shard's outbox is drained separately, concurrently with the others.
+    Each batch goes out as one POST /credit-batch/, which auth applies in a
+    single transaction. Grants carry their outbox key, so a batch resent after
+    a lost response is not credited twice.
+    """
+
+    def __init__(self):
+        self._wake = None
+        self._task = None
+        self.delivered = 0
+        self.failed_batches = 0
+
+    async def start(self):
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    def notify(self):
+        """Wakes the dispatcher so new grants are delivered without waiting a poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            delivered = await asyncio.gather(*(self._dispatch_shard(index) for index in range(len(shards))))
+            # Poll again straight away while any shard has a full batch waiting
+            if max(delivered) < GRANT_OUTBOX_BATCH_SIZE:
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), GRANT_OUTBOX_POLL_INTERVAL)
+                self._wake.clear()
+
+    async def _dispatch_shard(self, index: int) -> int:
+        try:
+            return await self.dispatch_batch(index)
+        except Exception as e:
+            print(f"Reward grant dispatch failed on shard {index}: {e}")
+            return 0
+
+    async def dispatch_batch(self, index: int) -> int:
+        """Delivers one batch of shard ``index``'s due grants and returns how many were acknowledged."""
+        grants = await run_on_shard(index, fetch_due_grants, GRANT_OUTBOX_BATCH_SIZE)
+        if not grants:
+            return 0
+        payload = {
+            "grants": [
+                {
+                    "grant_id": grant["grant_id"],
+                    "user_id": grant["user_id"],
+                    "gold": grant["gold"],
+                    "diamond": grant["diamond"],
+                }
+                for grant in grants
+            ]
+        }
+        try:
+            response = await http_client.post(AUTH_SERVICE_CREDIT_BATCH_URL, json=payload)
+            ok = response.status_code == 200
+            if not ok:
+                print(f"Failed to credit {len(grants)} reward grants: {response.text}")
+        except httpx.HTTPError as e:
+            print(f"Failed to credit {len(grants)} reward grants: {e}")
+            ok = False
+
+        if ok:
+            unknown_users = response.json().get("unknown_users", [])
+            if unknown_users:
+                print(f"Dropped reward grants for unknown users: {unknown_users}")
+            await run_on_shard(index, finish_grants, [(grant["grant_id"],) for grant in grants], [])
+            self.delivered += len(grants)
+            return len(grants)
+
+        # Grants are never dropped; keep retrying with capped backoff
+        self.failed_batches += 1
+        now = time.time()
+        retries = [
+            (
+                now + min(GRANT_OUTBOX_RETRY_BASE * 2 ** grant["attempts"], GRANT_OUTBOX_RETRY_MAX),
+                grant["grant_id"],
+            )
+            for grant in grants
+        ]
+        await run_on_shard(index, finish_grants, [], retries)
+        return 0
+
+    async def stats(self) -> dict:
+        def backlog(db: sqlite3.Connection):
+            return db.execute(
+                "SELECT COUNT(*) AS pending, MIN(created_at) AS oldest FROM Reward_Grant_Outbox"
+            ).fetchone()
+
+        rows = await run_all_shards(backlog)
+        oldest = [row["oldest"] for row in rows if row["oldest"] is not None]
+        return {
+            "pending": sum(row["pending"] for row in rows),
+            "oldest": min(oldest) if oldest else None,
+            "delivered": self.delivered,
+            "failed_batches": self.failed_batches,
+        }
+
+reward_grant_dispatcher = RewardGrantDispatcher()
+
+def archive_batch(db: sqlite3.Connection, after_rowid: int, cutoff: str):
+    """
+    Archives quests claimed before ``cutoff`` among the next
+    ARCHIVE_SCAN_SIZE User_Quest_Rewards rows after ``after_rowid``, together
+    with their Quest_Progress rows.
+
+    Returns ``(rows moved, last rowid examined, seconds the write lock was
+    held)``. The rowid is None once the end of the table is reached, and the
+    time is None if there was nothing left to examine.
+    """
+    # Find the batch's bounds before taking the write lock
+    bound = db.execute(
+        "SELECT rowid FROM User_Quest_Rewards WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?",
+        (after_rowid, ARCHIVE_SCAN_SIZE - 1)
+    ).fetchone()
+    last_rowid = bound[0] if bound else db.execute("SELECT MAX(rowid) FROM User_Quest_Rewards").fetchone()[0]
+    if last_rowid is None or last_rowid <= after_rowid:
+        return 0, None, None
+
+    selection = "rowid > ? AND rowid <= ? AND status = 'claimed' AND claimed_at < ?"
+    params = (after_rowid, last_rowid, cutoff)
+    db.execute("BEGIN IMMEDIATE")
+    locked_at = time.perf_counter()
+    db.execute(
+        f"""
+        INSERT OR REPLACE INTO User_Quest_Rewards_Archive
+            (user_id, quest_id, status, date, claimed_at, progress, current_streak, last_event_day)
+        SELECT r.user_id, r.quest_id, r.status, r.date, r.claimed_at, p.progress, p.current_streak, p.last_event_day
+        FROM (SELECT * FROM User_Quest_Rewards WHERE {selection}) r
+        LEFT JOIN Quest_Progress p ON p.user_id = r.user_id AND p.quest_id = r.quest_id
+        """,
+        params
+    )
+    db.execute(
+        f"""
+        DELETE FROM Quest_Progress WHERE (user_id, quest_id) IN (
+            SELECT user_id, quest_id FROM User_Quest_Rewards WHERE {selection}
+        )
+        """,
+        params
+    )
+    moved = db.execute(f"DELETE FROM User_Quest_Rewards WHERE {selection}", params).rowcount
+    db.commit()
+    held = time.perf_counter() - locked_at
+    return moved, last_rowid if bound else None, held
+
+def prune_transition_results(db: sqlite3.Connection, cutoff: str):
+    """
+    Deletes up to TRANSITION_RESULT_PRUNE_BATCH Quest_Transition_Results rows
+    stored before ``cutoff``.
+
+    Returns ``(rows deleted, seconds the write lock was held)``.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    locked_at = time.perf_counter()
+    deleted = db.execute(
+        """
+        DELETE FROM Quest_Transition_Results WHERE (user_id, idempotency_key) IN (
+            SELECT user_id, idempotency_key FROM Quest_Transition_Results
+            WHERE created_at < ? LIMIT ?
+        )
+        """,
+        (cutoff, TRANSITION_RESULT_PRUNE_BATCH)
+    ).rowcount
+    db.commit()
+    return deleted, time.perf_counter() - locked_at
+
+class QuestArchiver:
+    """
+    Background task moving claimed quests older than ARCHIVE_AFTER_DAYS out
+    of the tables every sign-in reads, and deleting stored transition
+    results older than TRANSITION_RESULT_TTL_HOURS.
+
+    Each pass walks every shard's User_Quest_Rewards in rowid order, one
+    short transaction per ARCHIVE_SCAN_SIZE rows, then prunes its transition
+    results TRANSITION_RESULT_PRUNE_BATCH rows at a time. It pauses between
+    transactions so request writes never wait long for the lock.
+    """
+
+    def __init__(self):
+        self._task = None
+        self.rows_moved = 0
+        self.results_pruned = 0
+        self.batches = 0
+        self.lock_time = 0.0
+        self.max_lock_time = 0.0
+        self.last_pass = None  # time.time() when the last full pass finished
+        self.last_error = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive_pass()
+                self.last_error = None
+            except Exception as e:
+                print(f"Quest archive pass failed: {e}")
+                self.last_error = str(e)
+            await asyncio.sleep(ARCHIVE_INTERVAL)
+
+    async def archive_pass(self) -> int:
+        """Archives every eligible row on every shard and returns how many moved."""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # Both in the format of CURRENT_TIMESTAMP
+        cutoff = (now - datetime.timedelta(days=ARCHIVE_AFTER_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        results_cutoff = (now - datetime.timedelta(hours=TRANSITION_RESULT_TTL_HOURS)).strftime("%Y-%m-%d %H:%M:%S")
+        moved = 0
+        for index in range(len(shards)):
+            after_rowid = 0
+            while after_rowid is not None:
+                count, after_rowid, held = await run_on_shard(index, archive_batch, after_rowid, cutoff)
+                if held is None:
+                    break
+                moved += count
+                self.rows_moved += count
+                self.batches += 1
+                self.lock_time += held
+                self.max_lock_time = max(self.max_lock_time, held)
+                if after_rowid is not None:
+                    await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+            while True:
+                deleted, held = await run_on_shard(index, prune_transition_results, results_cutoff)
+                self.results_pruned += deleted
+                self.batches += 1
+                self.lock_time += held
+                self.max_lock_time = max(self.max_lock_time, held)
+                if deleted < TRANSITION_RESULT_PRUNE_BATCH:
+                    break
+                await asyncio.sleep(ARCHIVE_BATCH_PAUSE)
+        self.last_pass = time.time()
+        return moved
+
+    def stats(self) -> dict:
+        return {
+            "rows_moved": self.rows_moved,
+            "results_pruned": self.results_pruned,
+            "batches": self.batches,
+            "lock_time": self.lock_time,
+            "max_lock_time": self.max_lock_time,
+            "avg_lock_time": self.lock_time / (self.batches or 1),
+            "last_pass": self.last_pass,
+            "last_error": self.last_error,
+        }
+
+quest_archiver = QuestArchiver()
+
+def insert_assignments(db: sqlite3.Connection, quest_id: int, user_ids: list) -> int:
+    """Assigns the quest to ``user_ids`` on one shard and returns how many were newly assigned."""
+    db.execute("BEGIN IMMEDIATE")
+    before = db.total_changes
+    # (user_id, quest_id) is the primary key, so users who already hold the
+    # quest are skipped by the insert itself; archived holders are skipped too
+    db.executemany(
+        """
+        INSERT OR IGNORE INTO User_Quest_Rewards (user_id, quest_id, status)
+        SELECT ?1, ?2, 'in_progress'
+        WHERE NOT EXISTS (
+            SELECT 1 FROM User_Quest_Rewards_Archive WHERE user_id = ?1 AND quest_id = ?2
+        )
+        """,
+        [(user_id, quest_id) for user_id in user_ids]
+    )
+    assigned = db.total_changes - before
+    db.commit()
+    return assigned
+
+async def assign_user_ids(job_id: int, quest_id: int, user_ids: list, last_user_id: int):
+    """
+    Assigns the quest to ``user_ids``, one transaction per shard, then records
+    the job's progress.
+
+    The shards commit before the job row does, so a chunk cut short by a
+    restart is redone on resume. Users it had already reached are skipped
+    then and not counted in ``assigned`` again.
+    """
+    groups = shards.partition(user_ids, lambda user_id: user_id)
+    assigned = await asyncio.gather(*(
+        run_on_shard(index, insert_assignments, quest_id, [user_id for _, user_id in group])
+        for index, group in groups.items()
+    ))
+    await run_db(record_job_chunk, job_id, len(user_ids), sum(assigned), last_user_id)
+
+def record_job_chunk(db: sqlite3.Connection, job_id: int, processed: int, assigned: int, last_user_id: int):
+    db.execute(
+        """
+        UPDATE Assignment_Jobs
+        SET processed = processed + ?, assigned = assigned + ?, last_user_id = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ?
+        """,
+        (processed, assigned, last_user_id, job_id)
+    )
+    db.commit()
+
+def fetch_job(db: sqlite3.Connection, job_id: int):
+    return db.execute("SELECT * FROM Assignment_Jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+def set_job_status(db: sqlite3.Connection, job_id: int, status: str, error: Optional[str] = None):
+    db.execute(
+        """
+        UPDATE Assignment_Jobs
+        SET status = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ? AND status = 'running'
+        """,
+        (status, error, job_id)
+    )
+    db.commit()
+
+class AssignmentJobRunner:
+    """
+    Runs bulk quest assignment jobs as background tasks, one chunk at a time.
+
+    Each chunk's progress is recorded once its users are assigned, so a job
+    interrupted by a restart resumes after the last recorded chunk.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+
+    async def start(self):
+        def running_jobs(db: sqlite3.Connection):
+            return [row["job_id"] for row in db.execute(
+                "SELECT job_id FROM Assignment_Jobs WHERE status = 'running'"
+            )]
+
+        for job_id in await run_db(running_jobs):
+            self.submit(job_id)
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+
+    def submit(self, job_id: int):
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id))
+
+    async def cancel(self, job_id: int):
+        await run_db(set_job_status, job_id, "cancelled")
+        task = self._tasks.get(job_id)
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+
+    async def _run(self, job_id: int):
+        try:
+            job = await run_db(fetch_job, job_id)
+            cohort = Cohort(**json.loads(job["cohort"]))
+            last_user_id = job["last_user_id"]
+            if cohort.user_ids is not None:
+                await self._run_list(job, sorted(set(cohort.user_ids)), last_user_id)
+            elif cohort.user_id_range is not None:
+                await self._run_range(job, cohort.user_id_range, last_user_id)
+            else:
+                await self._run_status(job, cohort.user_status, last_user_id)
+            await run_db(set_job_status, job_id, "completed")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Assignment job {job_id} failed: {e}")
+            await run_db(set_job_status, job_id, "failed", str(e))
+        finally:
+            self._tasks.pop(job_id, None)
+
+    async def _run_list(self, job, user_ids: list, last_user_id: Optional[int]):
+        position = 0 if last_user_id is None else bisect.bisect_right(user_ids, last_user_id)
+        while position < len(user_ids):
+            chunk = user_ids[position:position + ASSIGN_JOB_CHUNK_SIZE]
+            await assign_user_ids(job["job_id"], job["quest_id"], chunk, chunk[-1])
+            position += len(chunk)
+
+    async def _run_range(self, job, user_id_range: UserIdRange, last_user_id: Optional[int]):
+        after_id = user_id_range.start - 1 if last_user_id is None else last_user_id
+        await self._run_user_id_pages(job, {"before_id": user_id_range.end + 1}, after_id)
+
+    async def _run_status(self, job, user_status: str, last_user_id: Optional[int]):
+        await self._run_user_id_pages(job, {"status": user_status}, last_user_id or 0)
+
+    async def _run_user_id_pages(self, job, filters: dict, after_id: int):
+        """Assigns every existing user the Auth Service lists for ``filters`` above ``after_id``."""
+        while True:
+            response = await http_client.get(
+                AUTH_SERVICE_USER_IDS_URL,
+                params={**filters, "after_id": after_id, "limit": ASSIGN_JOB_CHUNK_SIZE},
+            )
+            response.raise_for_status()
+            user_ids = response.json()["user_ids"]
+            if not user_ids:
+                return
+            await assign_user_ids(job["job_id"], job["quest_id"], user_ids, user_ids[-1])
+            after_id = user_ids[-1]
+
+assignment_jobs = AssignmentJobRunner()
 
 # API Endpoints
 
+def get_quest_status(db: sqlite3.Connection, user_id: int, quest_id: int):
+    """Returns the user's status for a quest, or None if it is not assigned."""
+    cursor = db.cursor()
+    cursor.execute(
+        """
+        SELECT status FROM User_Quest_Rewards
+        WHERE user_id = ? AND quest_id = ?
+        """,
+        (user_id, quest_id)
+    )
+    result = cursor.fetchone()
+    if result is None:
+        # Archived quests were claimed
+        cursor.execute(
+            """
+            SELECT status FROM User_Quest_Rewards_Archive
+            WHERE user_id = ? AND quest_id = ?
+            """,
+            (user_id, quest_id)
+        )
+        result = cursor.fetchone()
+    return result["status"] if result else None
+
+def fetch_transition_result(db: sqlite3.Connection, user_id: int, idempotency_key: str, action: str, quest_id: int):
+    """Returns the stored ``(status_code, body)`` for an idempotency key, or None if it is unused."""
+    row = db.execute(
+        """
+        SELECT action, quest_id, status_code, body FROM Quest_Transition_Results
+        WHERE user_id = ? AND idempotency_key = ?
+        """,
+        (user_id, idempotency_key)
+    ).fetchone()
+    if row is None:
+        return None
+    if row["action"] != action or row["quest_id"] != quest_id:
+        return 409, {"detail": "Idempotency key already used for a different request"}
+    return row["status_code"], json.loads(row["body"])
+
+def run_transition(db: sqlite3.Connection, data: ClaimQuest, action: str, transition):
+    """
+    Runs ``transition(db)``, which returns ``(status_code, body)``, in one
+    write transaction.
+
+    With an idempotency key, the first result is stored in the same
+    transaction and returned to every retry without running it again.
+    """
+    key = data.idempotency_key
+    # Replays only read, without waiting for the write lock
+    if key is not None:
+        stored = fetch_transition_result(db, data.user_id, key, action, data.quest_id)
+        if stored is not None:
+            return stored
+    db.execute("BEGIN IMMEDIATE")
+    if key is not None:
+        # A concurrent request with the same key may have committed meanwhile
+        stored = fetch_transition_result(db, data.user_id, key, action, data.quest_id)
+        if stored is not None:
+            db.rollback()
+            return stored
+    status_code, body = transition(db)
+    if key is not None:
+        db.execute(
+            """
+            INSERT INTO Quest_Transition_Results (user_id, idempotency_key, action, quest_id, status_code, body)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (data.user_id, key, action, data.quest_id, status_code, json.dumps(body))
+        )
+    db.commit()
+    return status_code, body
+
 @app.post("/assign-quest/")
-def assign_quest(assign_quest: AssignQuest, db: sqlite3.Connection = Depends(get_db)):
+async def assign_quest(assign_quest: AssignQuest):
     """
     Assigns a quest to a user if duplication limits allow.
     """
@@ -142,220 +1159,502 @@ def assign_quest(assign_quest: AssignQuest, db: sqlite3.Connection = Depends(get
         
         duplication_limit = quest.get("duplication", 1)
 
-        cursor = db.cursor()
-        cursor.execute(
-            """
-            SELECT COUNT(*) as count FROM User_Quest_Rewards
-            WHERE user_id = ? AND quest_id = ?
-            """,
-            (assign_quest.user_id, assign_quest.quest_id)
-        )
-        result = cursor.fetchone()
-        current_count = result["count"]
+        def assign(db: sqlite3.Connection):
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM User_Quest_Rewards WHERE user_id = ?1 AND quest_id = ?2)
+                    + (SELECT COUNT(*) FROM User_Quest_Rewards_Archive WHERE user_id = ?1 AND quest_id = ?2)
+                    AS count
+                """,
+                (assign_quest.user_id, assign_quest.quest_id)
+            )
+            result = cursor.fetchone()
+            current_count = result["count"]
 
-        if current_count >= duplication_limit:
-            raise HTTPException(status_code=400, detail="Quest duplication limit reached for user")
+            if current_count >= duplication_limit:
+                raise HTTPException(status_code=400, detail="Quest duplication limit reached for user")
 
-        # Assign the quest
-        cursor.execute(
-            """
-            INSERT INTO User_Quest_Rewards (user_id, quest_id, status)
-            VALUES (?, ?, ?)
-            """,
-            (assign_quest.user_id, assign_quest.quest_id, "in_progress")
-        )
-        db.commit()
+            # Assign the quest
+            cursor.execute(
+                """
+                INSERT INTO User_Quest_Rewards (user_id, quest_id, status)
+                VALUES (?, ?, ?)
+                """,
+                (assign_quest.user_id, assign_quest.quest_id, "in_progress")
+            )
+            db.commit()
+
+        await run_shard(assign_quest.user_id, assign)
         return {"message": "Quest assigned successfully"}
     except HTTPException as he:
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/user-quests/{user_id}/", response_model=List[UserQuestReward])
-def get_user_quests(user_id: int, db: sqlite3.Connection = Depends(get_db)):
+def create_job(db: sqlite3.Connection, quest_id: int, cohort: Cohort, total: Optional[int]):
+    cursor = db.cursor()
+    cursor.execute(
+        """
+        INSERT INTO Assignment_Jobs (quest_id, cohort, status, total)
+        VALUES (?, ?, 'running', ?)
+        """,
+        (quest_id, cohort.json(exclude_none=True), total)
+    )
+    db.commit()
+    return cursor.lastrowid
+
+def job_response(job: sqlite3.Row) -> AssignmentJob:
+    return AssignmentJob(**{key: job[key] for key in AssignmentJob.__fields__})
+
+@app.post("/assign-quest/bulk/", status_code=202, response_model=AssignmentJob)
+async def bulk_assign_quest(data: BulkAssignQuest):
+    """
+    Starts a background job assigning a quest to a cohort of users.
+
+    The cohort is an explicit id list, the existing users in an inclusive id
+    range, or every user with a given status in the Auth Service. Users who
+    already hold the quest are skipped. Poll GET /assign-quest/jobs/{job_id}/ for progress.
+    """
+    cohort = data.cohort
+    selectors = [cohort.user_ids, cohort.user_id_range, cohort.user_status]
+    if sum(selector is not None for selector in selectors) != 1:
+        raise HTTPException(
+            status_code=400,
+            detail="Cohort needs exactly one of user_ids, user_id_range or user_status",
+        )
+    if cohort.user_id_range is not None and cohort.user_id_range.start > cohort.user_id_range.end:
+        raise HTTPException(status_code=400, detail="user_id_range start is after its end")
+
+    quest = get_quest_details(data.quest_id)
+    if not quest:
+        raise HTTPException(status_code=404, detail="Quest not found")
+    # A user holds a quest at most once, so a limit below 1 admits no one
+    if quest.get("duplication", 1) < 1:
+        raise HTTPException(status_code=400, detail="Quest duplication limit reached for user")
+
+    # Range and status cohorts count only existing users, found as the job runs
+    total = len(set(cohort.user_ids)) if cohort.user_ids is not None else None
+
+    job_id = await run_db(create_job, data.quest_id, cohort, total)
+    assignment_jobs.submit(job_id)
+    return job_response(await run_db(fetch_job, job_id))
+
+@app.get("/assign-quest/jobs/{job_id}/", response_model=AssignmentJob)
+async def get_assignment_job(job_id: int):
+    """
+    Reports a bulk assignment job's status and progress.
+    """
+    job = await run_db(fetch_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+@app.post("/assign-quest/jobs/{job_id}/cancel/", response_model=AssignmentJob)
+async def cancel_assignment_job(job_id: int):
+    """
+    Stops a running bulk assignment job. Chunks already committed stay assigned.
+    """
+    job = await run_db(fetch_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "running":
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    await assignment_jobs.cancel(job_id)
+    return job_response(await run_db(fetch_job, job_id))
+
+def encode_cursor(date: str, quest_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([date, quest_id]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    date, quest_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(date, str) or not isinstance(quest_id, int):
+        raise ValueError("malformed cursor")
+    return date, quest_id
+
+def fetch_user_quests(db: sqlite3.Connection, user_id: int, status: Optional[str], after: Optional[tuple], limit: int, columns: list, include_archived: bool = False):
+    """
+    Returns up to ``limit`` of the user's rows, newest first, that come after
+    the ``(date, quest_id)`` keyset position ``after``, optionally merged with
+    their archived rows.
+    """
+    conditions = ["user_id = ?"]
+    params = [user_id]
+    if status is not None:
+        conditions.append("status = ?")
+        params.append(status)
+    if after is not None:
+        conditions.append("(date, quest_id) < (?, ?)")
+        params.extend(after)
+    query = f"""
+        SELECT {", ".join(columns)} FROM User_Quest_Rewards
+        WHERE {" AND ".join(conditions)}
+        ORDER BY date DESC, quest_id DESC
+        LIMIT ?
+    """
+    args = (*params, limit)
+    if include_archived:
+        # Each table reads its newest ``limit`` rows through its own index;
+        # the outer ORDER BY merges them
+        query = f"""
+            SELECT * FROM ({query})
+            UNION ALL
+            SELECT * FROM (
+                SELECT {", ".join(columns)} FROM User_Quest_Rewards_Archive
+                WHERE {" AND ".join(conditions)}
+                ORDER BY date DESC, quest_id DESC
+                LIMIT ?
+            )
+            ORDER BY date DESC, quest_id DESC
+            LIMIT ?
+        """
+        args = (*args, *params, limit, limit)
+    cursor = db.cursor()
+    cursor.execute(query, args)
+    return cursor.fetchall()
+
+def check_acting_user(user_id: int, x_user_id: Optional[int]):
+    """
+    Rejects a request about ``user_id`` made with another user's token. The
+    gateway sends the token's verified user id as X-User-Id and drops any copy
+    the client sent; calls without it come from inside the deployment.
+    """
+    if x_user_id is not None and x_user_id != user_id:
+        raise HTTPException(status_code=403, detail="Not allowed to act for another user")
+
+@app.get("/user-quests/{user_id}/")
+async def get_user_quests(
+    user_id: int,
+    status: Optional[str] = None,
+    limit: int = USER_QUESTS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_archived: bool = False,
+    x_user_id: Optional[int] = Header(None),
+):
     """
-    Retrieves all quests assigned to a user.
+    Retrieves a page of the quests assigned to a user, newest first.
+
+    ``status`` filters by quest status and ``fields`` is a comma-separated
+    subset of user_id, quest_id, status and date. Old claimed quests are
+    archived and only listed with ``include_archived``. When more rows
+    follow, the X-Next-Cursor response header holds the ``cursor`` for the
+    next page.
     """
+    check_acting_user(user_id, x_user_id)
+    limit = max(1, min(limit, USER_QUESTS_PAGE_MAX))
+    selected = USER_QUEST_FIELDS if fields is None else [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in selected if field not in USER_QUEST_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(status_code=400, detail=f"fields must be drawn from {', '.join(USER_QUEST_FIELDS)}")
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # date and quest_id are always read, to build the next cursor
+    columns = ["quest_id", "date"] + (["status"] if "status" in selected else [])
+    # One extra row tells whether another page follows
+    rows = await run_shard(user_id, fetch_user_quests, user_id, status, after, limit + 1, columns, include_archived)
+    page = rows[:limit]
+    headers = {}
+    if len(rows) > limit:
+        headers["X-Next-Cursor"] = encode_cursor(page[-1]["date"], page[-1]["quest_id"])
+    return JSONResponse(
+        [
+            {field: user_id if field == "user_id" else row[field] for field in selected}
+            for row in page
+        ],
+        headers=headers
+    )
+
+def fetch_quest_progress(db: sqlite3.Connection, user_id: int, quest_id: int, include_archived: bool = False):
     cursor = db.cursor()
     cursor.execute(
         """
-        SELECT quest_id, status, date FROM User_Quest_Rewards WHERE user_id = ?
+        SELECT r.status, p.progress, p.current_streak, p.last_event_day
+        FROM User_Quest_Rewards r
+        LEFT JOIN Quest_Progress p ON p.user_id = r.user_id AND p.quest_id = r.quest_id
+        WHERE r.user_id = ? AND r.quest_id = ?
         """,
-        (user_id,)
+        (user_id, quest_id)
     )
-    user_quests = cursor.fetchall()
-    return [
-        UserQuestReward(
-            user_id=user_id,
-            quest_id=quest["quest_id"],
-            status=quest["status"],
-            date=quest["date"]
+    row = cursor.fetchone()
+    if row is None and include_archived:
+        cursor.execute(
+            """
+            SELECT status, progress, current_streak, last_event_day
+            FROM User_Quest_Rewards_Archive
+            WHERE user_id = ? AND quest_id = ?
+            """,
+            (user_id, quest_id)
         )
-        for quest in user_quests
-    ]
+        row = cursor.fetchone()
+    return row
+
+@app.get("/user-quests/{user_id}/{quest_id}/", response_model=QuestProgress)
+async def get_quest_progress(
+    user_id: int, quest_id: int, include_archived: bool = False, x_user_id: Optional[int] = Header(None)
+):
+    """
+    Returns the user's progress and current streak on one quest. Archived
+    quests are only found with ``include_archived``.
+    """
+    check_acting_user(user_id, x_user_id)
+    row = await run_shard(user_id, fetch_quest_progress, user_id, quest_id, include_archived)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Quest not assigned to user")
+    quest = get_quest_details(quest_id)
+    return QuestProgress(
+        user_id=user_id,
+        quest_id=quest_id,
+        status=row["status"],
+        progress=row["progress"] or 0,
+        current_streak=row["current_streak"] or 0,
+        streak_required=quest["streak"] if quest else None,
+        last_event_day=row["last_event_day"]
+    )
 
 @app.post("/complete-quest/")
-def complete_quest(assign_quest: AssignQuest, db: sqlite3.Connection = Depends(get_db)):
+async def complete_quest(data: CompleteQuest, x_user_id: Optional[int] = Header(None)):
     """
-    Marks a quest as completed or claimed based on auto_claim settings.
+    Completes an in-progress quest whose streak meets the quest's requirement,
+    e.g. after the requirement was lowered. Auto-claimed quests are claimed
+    and their reward queued at once.
     """
+    check_acting_user(data.user_id, x_user_id)
     try:
         # Fetch quest details
-        quest = get_quest_details(assign_quest.quest_id)
+        quest = get_quest_details(data.quest_id)
         if not quest:
             raise HTTPException(status_code=404, detail="Quest not found")
-        
-        cursor = db.cursor()
+        auto_claim = quest.get("auto_claim", False)
+        grant = reward_grant_row(data.user_id, data.quest_id, get_reward_details(quest["reward_id"])) if auto_claim else None
+        new_status = "claimed" if auto_claim else "completed"
+
+        def complete(db: sqlite3.Connection):
+            # The status check and the change are one statement, so concurrent
+            # calls cannot both complete the quest
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                UPDATE User_Quest_Rewards
+                SET status = ?, claimed_at = CASE WHEN ? = 'claimed' THEN CURRENT_TIMESTAMP END
+                WHERE user_id = ? AND quest_id = ? AND status = 'in_progress'
+                AND (
+                    SELECT current_streak FROM Quest_Progress p
+                    WHERE p.user_id = User_Quest_Rewards.user_id AND p.quest_id = User_Quest_Rewards.quest_id
+                ) >= ?
+                """,
+                (new_status, new_status, data.user_id, data.quest_id, quest["streak"])
+            )
+            if cursor.rowcount == 1:
+                if not auto_claim:
+                    return 200, {"message": "Quest completed. Please claim your reward."}
+                if grant is None:
+                    return 200, {"message": "Quest completed but failed to grant reward."}
+                insert_reward_grants(cursor, [grant])
+                return 200, {"message": "Quest completed and reward granted."}
+
+            # Nothing changed; report why
+            current_status = get_quest_status(db, data.user_id, data.quest_id)
+            if current_status is None:
+                return 404, {"detail": "Quest not assigned to user"}
+            if current_status == "claimed":
+                return 400, {"detail": "Quest already claimed"}
+            if current_status == "completed":
+                if not auto_claim:
+                    # Awaiting manual claim
+                    return 200, {"message": "Quest already completed. Please claim your reward."}
+                # Auto-claimed quests should already be "claimed"
+                return 200, {"message": "Quest already claimed."}
+            return 400, {"detail": "Quest not yet completed"}
+
+        status_code, body = await run_shard(data.user_id, run_transition, data, "complete", complete)
+        reward_grant_dispatcher.notify()
+        return JSONResponse(body, status_code=status_code)
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def event_day(event: Event) -> str:
+    """Returns the UTC calendar day an event counts towards, as YYYY-MM-DD."""
+    occurred_at = event.occurred_at
+    if occurred_at is None:
+        occurred_at = datetime.datetime.now(datetime.timezone.utc)
+    elif occurred_at.tzinfo is not None:
+        occurred_at = occurred_at.astimezone(datetime.timezone.utc)
+    return occurred_at.date().isoformat()
+
+def next_streak(current_streak: Optional[int], last_day: Optional[str], day: str) -> int:
+    """Returns the streak after an event on ``day``, given the previous state."""
+    if last_day is None:
+        return 1
+    # Another event the same day, or one delivered late, leaves the streak alone
+    if day <= last_day:
+        return current_streak
+    gap = datetime.date.fromisoformat(day) - datetime.date.fromisoformat(last_day)
+    return current_streak + 1 if gap.days == 1 else 1
+
+def advance_quests(db: sqlite3.Connection, user_id: int, quests: list, day: str):
+    """
+    Advances the user's progress on the given quests for one event on ``day``.
+
+    A quest completes once its streak of consecutive days reaches the quest's
+    ``streak``. Rewards of auto-claimed quests are queued in
+    Reward_Grant_Outbox. Runs in the caller's transaction; returns the
+    per-quest messages.
+    """
+    cursor = db.cursor()
+    quest_ids = [quest["quest_id"] for quest in quests]
+    states = {}
+    for start in range(0, len(quest_ids), SQL_IN_CHUNK_SIZE):
+        chunk = quest_ids[start:start + SQL_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
         cursor.execute(
-            """
-            SELECT status FROM User_Quest_Rewards
-            WHERE user_id = ? AND quest_id = ?
+            f"""
+            SELECT r.quest_id, r.status, p.current_streak, p.last_event_day
+            FROM User_Quest_Rewards r
+            LEFT JOIN Quest_Progress p ON p.user_id = r.user_id AND p.quest_id = r.quest_id
+            WHERE r.user_id = ? AND r.quest_id IN ({placeholders})
             """,
-            (assign_quest.user_id, assign_quest.quest_id)
+            (user_id, *chunk)
         )
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Quest not assigned to user")
-        
-        current_status = result["status"]
+        states.update((row["quest_id"], row) for row in cursor.fetchall())
+    # Quests missing from the hot table may have been archived once claimed
+    missing = [quest_id for quest_id in quest_ids if quest_id not in states]
+    for start in range(0, len(missing), SQL_IN_CHUNK_SIZE):
+        chunk = missing[start:start + SQL_IN_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(
+            f"""
+            SELECT quest_id, status FROM User_Quest_Rewards_Archive
+            WHERE user_id = ? AND quest_id IN ({placeholders})
+            """,
+            (user_id, *chunk)
+        )
+        states.update((row["quest_id"], row) for row in cursor.fetchall())
+
+    inserts = []
+    updates = []
+    progress = []
+    messages = []
+    grants = []
+    for quest in quests:
+        quest_id = quest["quest_id"]
+        streak_required = quest["streak"]
+        state = states.get(quest_id)
+        current_status = state["status"] if state else None
+
         if current_status == "claimed":
-            raise HTTPException(status_code=400, detail="Quest already claimed")
+            messages.append(f"Quest '{quest['name']}' already claimed.")
+            continue
         if current_status == "completed":
-            if not quest.get("auto_claim", False):
-                # Awaiting manual claim
-                return {"message": "Quest already completed. Please claim your reward."}
+            messages.append(f"Quest '{quest['name']}' already completed. Please claim your reward.")
+            continue
+
+        last_day = state["last_event_day"] if state else None
+        streak = next_streak(state["current_streak"] if state else None, last_day, day)
+        progress.append((user_id, quest_id, streak, max(day, last_day or day)))
+
+        if streak >= streak_required:
+            if quest["auto_claim"]:
+                new_status = "claimed"
+                grant = reward_grant_row(user_id, quest_id, get_reward_details(quest["reward_id"]))
+                if grant:
+                    grants.append(grant)
+                    messages.append(f"Quest '{quest['name']}' completed and reward granted.")
+                else:
+                    messages.append(f"Quest '{quest['name']}' completed but failed to grant reward.")
             else:
-                # Auto-claimed quests should already be "claimed"
-                return {"message": "Quest already claimed."}
-        
-        # Determine if quest completion criteria are met
-        # Since progress tracking is handled via track_sign_in, this endpoint may be redundant
-        # Alternatively, implement logic to verify completion here
-        raise HTTPException(status_code=400, detail="Quest not yet completed")
-        
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+                new_status = "completed"
+                messages.append(f"Quest '{quest['name']}' completed. Please claim your reward.")
+        else:
+            new_status = "in_progress"
+            messages.append(f"Progress for quest '{quest['name']}': {streak}/{streak_required}")
+
+        if current_status is None:
+            inserts.append((user_id, quest_id, new_status, new_status))
+        elif new_status != current_status:
+            updates.append((new_status, new_status, user_id, quest_id))
+
+    cursor.executemany(
+        """
+        INSERT INTO User_Quest_Rewards (user_id, quest_id, status, claimed_at)
+        VALUES (?, ?, ?, CASE WHEN ? = 'claimed' THEN CURRENT_TIMESTAMP END)
+        """,
+        inserts
+    )
+    cursor.executemany(
+        """
+        UPDATE User_Quest_Rewards
+        SET status = ?, claimed_at = CASE WHEN ? = 'claimed' THEN CURRENT_TIMESTAMP ELSE claimed_at END
+        WHERE user_id = ? AND quest_id = ?
+        """,
+        updates
+    )
+    cursor.executemany(
+        """
+        INSERT INTO Quest_Progress (user_id, quest_id, progress, current_streak, last_event_day)
+        VALUES (?, ?, 1, ?, ?)
+        ON CONFLICT (user_id, quest_id) DO UPDATE SET
+            progress = progress + 1,
+            current_streak = excluded.current_streak,
+            last_event_day = excluded.last_event_day
+        """,
+        progress
+    )
+    insert_reward_grants(cursor, grants)
+    return messages
+
+def apply_events(db: sqlite3.Connection, matched: list):
+    """
+    Applies ``(user_id, quests, day)`` tuples, one per event, in a single write
+    transaction and returns each event's messages. All users must be on
+    ``db``'s shard.
+    """
+    # Take the write lock up front so the reads and writes below are atomic
+    db.execute("BEGIN IMMEDIATE")
+    results = [advance_quests(db, user_id, quests, day) for user_id, quests, day in matched]
+    db.commit()
+    return results
+
+async def apply_sharded_events(matched: list) -> list:
+    """
+    Applies ``(user_id, quests, day)`` tuples with one apply_events transaction
+    per shard, run concurrently. Returns each event's messages in order.
+    """
+    results = [None] * len(matched)
+
+    async def apply_group(index: int, group: list):
+        applied = await run_on_shard(index, apply_events, [item for _, item in group])
+        for (position, _), messages in zip(group, applied):
+            results[position] = messages
+
+    groups = shards.partition(matched, lambda item: item[0])
+    await asyncio.gather(*(apply_group(index, group) for index, group in groups.items()))
+    return results
 
 @app.post("/track-sign-in/")
-def track_sign_in(data: TrackSignIn, db: sqlite3.Connection = Depends(get_db)):
+async def track_sign_in(data: TrackSignIn):
     """
     Tracks user sign-ins and updates quest progress accordingly.
     """
-    user_id = data.user_id
     try:
-        # Fetch all quests from Quest Catalog Service
-        all_quests = get_all_quests()
-        if not all_quests:
+        if not catalog_cache.quests:
             raise HTTPException(status_code=500, detail="Failed to fetch quests from Quest Catalog Service")
         
-        # Filter quests related to sign-ins (Assuming quests with 'Sign In' in their name)
-        sign_in_quests = [q for q in all_quests if "Sign In" in q["name"]]
-
+        event = Event(user_id=data.user_id, type="sign_in")
+        sign_in_quests = match_event_quests(event)
         if not sign_in_quests:
             return {"messages": ["No sign-in quests available."]}
-        
-        messages = []
-        cursor = db.cursor()
-
-        for quest in sign_in_quests:
-            quest_id = quest["quest_id"]
-            streak_required = quest["streak"]
-            auto_claim = quest["auto_claim"]
-            duplication_limit = quest.get("duplication", 1)
-            reward_id = quest["reward_id"]
 
-            # Fetch current progress and status
-            cursor.execute(
-                """
-                SELECT status FROM User_Quest_Rewards
-                WHERE user_id = ? AND quest_id = ?
-                """,
-                (user_id, quest_id)
-            )
-            result = cursor.fetchone()
-            if result:
-                current_status = result["status"]
-            else:
-                current_status = None
-
-            if current_status == "claimed":
-                messages.append(f"Quest '{quest['name']}' already claimed.")
-                continue
-
-            # Count how many times the user has completed this quest
-            cursor.execute(
-                """
-                SELECT COUNT(*) as count FROM User_Quest_Rewards
-                WHERE user_id = ? AND quest_id = ?
-                """,
-                (user_id, quest_id)
-            )
-            count_result = cursor.fetchone()
-            current_count = count_result["count"] if count_result else 0
-
-            if current_count >= duplication_limit:
-                messages.append(f"Quest '{quest['name']}' duplication limit reached.")
-                continue
-
-            # Assign quest if not already assigned
-            if not result:
-                cursor.execute(
-                    """
-                    INSERT INTO User_Quest_Rewards (user_id, quest_id, status)
-                    VALUES (?, ?, ?)
-                    """,
-                    (user_id, quest_id, "in_progress")
-                )
-                db.commit()
-                current_status = "in_progress"
-                current_count += 1
-
-            # Check if the current sign-in completes the streak
-            if current_count + 1 >= streak_required:
-                if auto_claim:
-                    # Update status to 'claimed' and grant reward
-                    cursor.execute(
-                        """
-                        UPDATE User_Quest_Rewards
-                        SET status = ?
-                        WHERE user_id = ? AND quest_id = ?
-                        """,
-                        ("claimed", user_id, quest_id)
-                    )
-                    db.commit()
-                    # Fetch reward details
-                    reward = get_reward_details(reward_id)
-                    if reward:
-                        reward_user(user_id, reward["reward_qty"], reward["reward_item"])
-                        messages.append(f"Quest '{quest['name']}' completed and reward granted.")
-                    else:
-                        messages.append(f"Quest '{quest['name']}' completed but failed to grant reward.")
-                else:
-                    # Update status to 'completed' and await manual claim
-                    cursor.execute(
-                        """
-                        UPDATE User_Quest_Rewards
-                        SET status = ?
-                        WHERE user_id = ? AND quest_id = ?
-                        """,
-                        ("completed", user_id, quest_id)
-                    )
-                    db.commit()
-                    messages.append(f"Quest '{quest['name']}' completed. Please claim your reward.")
-            else:
-                # Quest is still in progress
-                cursor.execute(
-                    """
-                    UPDATE User_Quest_Rewards
-                    SET status = ?
-                    WHERE user_id = ? AND quest_id = ?
-                    """,
-                    ("in_progress", user_id, quest_id)
-                )
-                db.commit()
-                messages.append(f"Progress for quest '{quest['name']}': {current_count + 1}/{streak_required}")
+        (messages,) = await run_shard(
+            data.user_id, apply_events, [(data.user_id, sign_in_quests, event_day(event))]
+        )
+        reward_grant_dispatcher.notify()
         
         return {"messages": messages}
     except HTTPException as he:
@@ -363,59 +1662,116 @@ def track_sign_in(data: TrackSignIn, db: sqlite3.Connection = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/events")
+async def ingest_events(batch: EventBatch):
+    """
+    Advances quests from a batch of events, e.g. {"user_id": 1, "type": "sign_in"}.
+
+    Each event is matched against the quests whose trigger names its type and
+    whose predicates hold for its attributes. Each shard's events are applied
+    in one transaction; results are returned in event order. If one shard
+    fails after others committed, resending the batch only bumps their raw
+    progress counts again: the events' days leave streaks as they were, and
+    completed or claimed quests are not rewarded twice.
+    """
+    if len(batch.events) > EVENT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {EVENT_BATCH_MAX_SIZE} events per batch",
+        )
+    if catalog_cache.last_refresh is None or not catalog_cache.quests:
+        # Retryable, so senders keep the events until quests can be matched
+        raise HTTPException(status_code=503, detail="Quest catalog not loaded yet")
+    try:
+        matched = [
+            (event.user_id, match_event_quests(event), event_day(event))
+            for event in batch.events
+        ]
+        to_apply = [(user_id, quests, day) for user_id, quests, day in matched if quests]
+        applied = iter(await apply_sharded_events(to_apply))
+        reward_grant_dispatcher.notify()
+        return {
+            "results": [
+                {"messages": next(applied) if quests else []}
+                for _, quests, _ in matched
+            ]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/claim-quest/")
-def claim_quest(assign_quest: AssignQuest, db: sqlite3.Connection = Depends(get_db)):
+async def claim_quest(data: ClaimQuest, x_user_id: Optional[int] = Header(None)):
     """
     Allows users to manually claim rewards for quests that require manual claiming.
     """
+    check_acting_user(data.user_id, x_user_id)
     try:
         # Fetch quest details
-        quest = get_quest_details(assign_quest.quest_id)
+        quest = get_quest_details(data.quest_id)
         if not quest:
             raise HTTPException(status_code=404, detail="Quest not found")
         
-        cursor = db.cursor()
-        cursor.execute(
-            """
-            SELECT status FROM User_Quest_Rewards
-            WHERE user_id = ? AND quest_id = ?
-            """,
-            (assign_quest.user_id, assign_quest.quest_id)
-        )
-        result = cursor.fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Quest not assigned to user")
-        
-        current_status = result["status"]
-        if current_status == "claimed":
-            raise HTTPException(status_code=400, detail="Quest already claimed")
-        if current_status != "completed":
-            raise HTTPException(status_code=400, detail="Quest not yet completed")
-        
-        # Update status to "claimed"
-        cursor.execute(
-            """
-            UPDATE User_Quest_Rewards
-            SET status = ?
-            WHERE user_id = ? AND quest_id = ?
-            """,
-            ("claimed", assign_quest.user_id, assign_quest.quest_id)
-        )
-        db.commit()
-        
         # Fetch reward details
         reward = get_reward_details(quest["reward_id"])
-        if reward:
-            reward_user(assign_quest.user_id, reward["reward_qty"], reward["reward_item"])
-            return {"message": "Quest claimed and reward granted"}
-        else:
+        if not reward:
             raise HTTPException(status_code=500, detail="Reward details not found")
+        grant = reward_grant_row(data.user_id, data.quest_id, reward)
+
+        def claim(db: sqlite3.Connection):
+            # Only one of any number of concurrent claims can match
+            # status = 'completed', so the reward is queued once
+            cursor = db.cursor()
+            cursor.execute(
+                """
+                UPDATE User_Quest_Rewards
+                SET status = 'claimed', claimed_at = CURRENT_TIMESTAMP
+                WHERE user_id = ? AND quest_id = ? AND status = 'completed'
+                """,
+                (data.user_id, data.quest_id)
+            )
+            if cursor.rowcount == 1:
+                # Queued with the status change, so the grant cannot be lost
+                if grant:
+                    insert_reward_grants(cursor, [grant])
+                return 200, {"message": "Quest claimed and reward granted"}
+
+            # Nothing changed; report why
+            current_status = get_quest_status(db, data.user_id, data.quest_id)
+            if current_status is None:
+                return 404, {"detail": "Quest not assigned to user"}
+            if current_status == "claimed":
+                return 400, {"detail": "Quest already claimed"}
+            return 400, {"detail": "Quest not yet completed"}
+
+        status_code, body = await run_shard(data.user_id, run_transition, data, "claim", claim)
+        reward_grant_dispatcher.notify()
+        return JSONResponse(body, status_code=status_code)
         
     except HTTPException as he:
         raise he
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics/db")
+async def get_db_metrics():
+    """Reports connection pool usage, for the jobs database and each shard."""
+    return {"jobs": db_pool.stats(), "shards": shards.stats()}
+
+@app.get("/metrics/catalog-cache")
+async def get_catalog_cache_metrics():
+    """Reports the local catalog copy's version, size and freshness."""
+    return catalog_cache.stats()
+
+@app.get("/metrics/archive")
+async def get_archive_metrics():
+    """Reports rows the archiver has moved and how long it held write locks."""
+    return quest_archiver.stats()
+
+@app.get("/metrics/reward-outbox")
+async def get_reward_outbox_metrics():
+    """Reports reward grants still waiting for the Auth Service."""
+    return await reward_grant_dispatcher.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8003)
\ No newline at end of file
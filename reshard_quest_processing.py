@@ -0,0 +1,47 @@
+# reshard_quest_processing.py
+#
+# Moves the Quest Processing Service's per-user tables from one shard layout
+# to another. Run it from the service's directory with the service stopped,
+# then set PROCESSING_SHARD_COUNT to the new count and start the service:
+#
+#   python reshard_quest_processing.py FROM_COUNT TO_COUNT
+#
+# The old files are only read; delete them once the new layout is in service.
+
+import os
+import sys
+
+import quest_processing_service as service
+from sharding import reshard
+
+
+def main(argv):
+    if len(argv) != 2:
+        sys.exit("usage: python reshard_quest_processing.py FROM_COUNT TO_COUNT")
+    from_count, to_count = (int(arg) for arg in argv)
+    if from_count < 1 or to_count < 1:
+        sys.exit("Shard counts must be at least 1")
+    if from_count == to_count:
+        sys.exit(f"Already at {from_count} shards")
+    missing = [
+        path for path in service.shard_paths(from_count) if not os.path.exists(path)
+    ]
+    if missing:
+        sys.exit(f"Missing shard files: {', '.join(missing)}")
+
+    counts = reshard(
+        service.shard_paths(from_count),
+        service.shard_paths(to_count),
+        service.SHARDED_TABLES,
+        service.init_shard_db,
+    )
+    for table, rows in counts.items():
+        print(f"{table}: {rows} rows")
+    print(
+        f"Resharded {from_count} -> {to_count}. "
+        f"Set PROCESSING_SHARD_COUNT = {to_count} before restarting the service."
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
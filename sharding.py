@@ -0,0 +1,121 @@
+# sharding.py
+
+import sqlite3
+from typing import Callable, List
+
+from database import ConnectionPool, connect
+
+# Knuth's multiplicative hash spreads sequential user ids evenly over shards
+HASH_MULTIPLIER = 2654435761
+HASH_MASK = 0xFFFFFFFF
+
+RESHARD_BATCH_SIZE = 5000  # rows read from a source shard at a time
+
+
+def shard_for(user_id: int, shard_count: int) -> int:
+    """Returns the index of the shard holding ``user_id``'s rows."""
+    return ((user_id * HASH_MULTIPLIER) & HASH_MASK) % shard_count
+
+
+class ShardSet:
+    """Connection pools for tables split by user_id hash across database files.
+
+    Each file has its own pool and its own SQLite write lock, so writes for
+    users on different shards never wait on each other. A user's rows all
+    live in one shard, so per-user transactions stay local to one file.
+    """
+
+    def __init__(self, paths: List[str], **pool_options):
+        self.paths = list(paths)
+        self.pools = [ConnectionPool(path, **pool_options) for path in self.paths]
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def index_for(self, user_id: int) -> int:
+        return shard_for(user_id, len(self.pools))
+
+    def pool_for(self, user_id: int) -> ConnectionPool:
+        return self.pools[self.index_for(user_id)]
+
+    def partition(self, items: list, user_id: Callable) -> dict:
+        """Groups ``items`` by shard index, keeping each item's position.
+
+        Returns ``{shard_index: [(position, item), ...]}``, so results computed
+        per shard can be put back in the original order.
+        """
+        groups = {}
+        for position, item in enumerate(items):
+            groups.setdefault(self.index_for(user_id(item)), []).append(
+                (position, item)
+            )
+        return groups
+
+    def stats(self) -> list:
+        return [
+            dict(pool.stats(), path=path) for path, pool in zip(self.paths, self.pools)
+        ]
+
+    def close(self):
+        for pool in self.pools:
+            pool.close()
+
+
+def reshard(
+    source_paths: List[str],
+    target_paths: List[str],
+    tables: List[str],
+    init_shard: Callable[[sqlite3.Connection], None],
+) -> dict:
+    """Copies every row of ``tables`` from one shard layout to another.
+
+    Rows are placed by their user_id column. Targets are created with
+    ``init_shard``, emptied of ``tables`` (they may hold rows from an older
+    layout) and filled in one transaction each; sources are only read. Meant
+    to run offline, with the service stopped. Returns rows copied per table.
+    """
+    if set(source_paths) & set(target_paths):
+        raise ValueError("source and target layouts share a file")
+    targets = [connect(path) for path in target_paths]
+    counts = {table: 0 for table in tables}
+    try:
+        for conn in targets:
+            init_shard(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            for table in tables:
+                conn.execute(f"DELETE FROM {table}")
+        for path in source_paths:
+            source = connect(path)
+            try:
+                for table in tables:
+                    columns = [
+                        row["name"]
+                        for row in source.execute(f"PRAGMA table_info({table})")
+                    ]
+                    if not columns:
+                        continue  # the table predates this layout
+                    column_list = ", ".join(columns)
+                    insert = (
+                        f"INSERT OR REPLACE INTO {table} ({column_list}) "
+                        f"VALUES ({', '.join('?' * len(columns))})"
+                    )
+                    rows = source.execute(f"SELECT {column_list} FROM {table}")
+                    while True:
+                        batch = rows.fetchmany(RESHARD_BATCH_SIZE)
+                        if not batch:
+                            break
+                        by_shard = {}
+                        for row in batch:
+                            index = shard_for(row["user_id"], len(targets))
+                            by_shard.setdefault(index, []).append(tuple(row))
+                        for index, shard_rows in by_shard.items():
+                            targets[index].executemany(insert, shard_rows)
+                        counts[table] += len(batch)
+            finally:
+                source.close()
+        for conn in targets:
+            conn.commit()
+    finally:
+        for conn in targets:
+            conn.close()
+    return counts